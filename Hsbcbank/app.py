@@ -1,17 +1,34 @@
+import atexit
 import os
 import logging
-import gc
-from flask import Flask, request, jsonify, render_template, send_file, session
+from flask import Flask, request, jsonify, render_template, url_for
+from markupsafe import Markup
 from flask_cors import CORS
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models import Base, Cardholder, Transaction, Statement
+from models import Base, Cardholder, Statement
+from database import create_configured_engine
+from migrations import migrate_on_startup
+from archival import create_archival_worker
 from pdf_generator import StatementPDFGenerator
 from languages import LANGUAGE_PACKS, LANGUAGE_CODES
 from performance_logger import PerformanceLogger
+from memory_governor import memory_governor
+from statement_cache import StatementPDFCache, make_cache_key
+from jobs import create_job_queue, JOB_SUCCEEDED
+from write_behind import WriteBehindQueue
+from downloads import DownloadTokens, send_statement
+from statement_store import StatementStore
+from assets import compress_response, load_manifest, send_asset
+from ingest import TransactionSpool, UploadError, ingest_transactions, iter_upload, upload_format
+from repository import (
+    bulk_insert_transactions, upsert_cardholder, aggregate_transactions, compute_statement_summary,
+    get_period_transactions, iter_period_transactions, build_transaction_rows, CardholderCache, DateParser,
+    DEFAULT_TRANSACTIONS
+)
 import datetime
 import tempfile
 import uuid
+from types import SimpleNamespace
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,31 +40,474 @@ app.secret_key = os.environ.get("SESSION_SECRET")
 if not app.secret_key:
     raise ValueError("SESSION_SECRET environment variable is required")
 CORS(app)
+# Hashed, precompressed static assets from `python assets.py`; plain static files are used until it has run
+asset_manifest = load_manifest()
+# HTML and JSON responses at least this large are compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
 
-# Database connection
-DATABASE_URI = os.environ.get('DATABASE_URL')
-if DATABASE_URI is None:
-    # Fallback to SQLite for local development
-    DATABASE_URI = 'sqlite:///credit_card.db'
-    logger.warning("No DATABASE_URL found, using SQLite instead")
+# Let the front-end server (Apache mod_xsendfile, lighttpd) send downloaded files
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes', 'on')
 
-# For PostgreSQL from SQLAlchemy 1.4.x
-if DATABASE_URI.startswith("postgres://"):
-    DATABASE_URI = DATABASE_URI.replace("postgres://", "postgresql://", 1)
+logger.info(f"Memory governor: {memory_governor.get_stats()}")
 
-engine = create_engine(DATABASE_URI)
+# Database connection, configured from the environment (see database.py)
+engine = create_configured_engine()
 Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
+migrate_on_startup(engine)
+# Objects stay usable after commit, so rendering does not reload them
+Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+# Moves closed billing cycles out of the hot transactions table when ARCHIVE_ENABLED is set
+archival_worker = create_archival_worker(engine)
 
 perf_logger = PerformanceLogger()
 
+# Hot cardholder ids by card number
+cardholder_cache = CardholderCache(max_entries=int(os.environ.get('CARDHOLDER_CACHE_SIZE', 10000)))
+
+# Cache of rendered PDFs keyed by the content that determines them
+pdf_cache = StatementPDFCache(
+    max_entries=int(os.environ.get('PDF_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(float(os.environ.get('PDF_CACHE_MAX_MB', 64)) * 1024 * 1024),
+    disk_dir=os.environ.get('PDF_CACHE_DIR') or None
+)
+
+# Generated PDFs waiting to be downloaded, removed after a TTL or when over quota
+statement_store = StatementStore(
+    os.environ.get('STATEMENT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'hsbc_statements')),
+    ttl_seconds=int(os.environ.get('STATEMENT_STORE_TTL_SECONDS', 3600)),
+    max_bytes=int(float(os.environ.get('STATEMENT_STORE_MAX_MB', 512)) * 1024 * 1024)
+).start_sweeper(int(os.environ.get('STATEMENT_STORE_SWEEP_SECONDS', 60)))
+atexit.register(statement_store.shutdown)
+
+# Download links stay valid as long as the PDF is kept
+download_tokens = DownloadTokens(app.secret_key, statement_store.ttl_seconds)
+
+# Signed links to /api/cardholders/<token>/statement, handed out with statements generated for the cardholder
+cardholder_tokens = DownloadTokens(
+    app.secret_key, int(os.environ.get('CARDHOLDER_LINK_TTL_SECONDS', 30 * 24 * 3600)), salt='cardholder-statement'
+)
+
+# Rendered preview HTML keyed by the normalised preview content; the PDF cache's LRU works for any bytes
+preview_cache = StatementPDFCache(
+    max_entries=int(os.environ.get('PREVIEW_CACHE_MAX_ENTRIES', 512)),
+    max_bytes=int(float(os.environ.get('PREVIEW_CACHE_MAX_MB', 16)) * 1024 * 1024)
+)
+
+# Statement summary values used when the request does not provide them
+STATEMENT_DEFAULTS = {
+    'previous_balance': 13840.00,
+    'payments_received': 175.50,
+    'purchases_charges': 640.00,
+    'finance_charges': 45.00,
+    'new_balance': 13935.50,
+    'credit_limit': 175.00,
+    'available_credit': 1230.00,
+    'reward_points': 175
+}
+
+# 'request' takes summary figures from the payload, 'ledger' derives them from stored transactions
+SUMMARY_MODES = ('request', 'ledger')
+STATEMENT_SUMMARY_MODE = os.environ.get('STATEMENT_SUMMARY_MODE', 'request')
+STATEMENT_PERIOD_DAYS = 30
+
+# 'sync' writes before rendering, 'write_behind' renders first and writes in the background,
+# 'ephemeral' never writes (previews and tests)
+PERSISTENCE_MODES = ('sync', 'write_behind', 'ephemeral')
+PERSISTENCE_MODE = os.environ.get('PERSISTENCE_MODE', 'sync')
+
+DEFAULT_BILLING_ADDRESS = "D-45, Green Park,\nNew Delhi-110016, India"
+
+# Uploaded transactions inserted per round trip
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1000))
+
+@app.template_global()
+def asset_url(path):
+    """URL of a static asset, using its hashed build when there is one"""
+    if path in asset_manifest:
+        return url_for('static_asset', filename=asset_manifest[path])
+    return url_for('static', filename=path)
+
+@app.route('/assets/<path:filename>')
+def static_asset(filename):
+    """Serve a hashed asset; its name changes with its content, so it can be cached forever"""
+    return send_asset(filename, request.accept_encodings)
+
+@app.after_request
+def compress_dynamic_response(response):
+    """Compress large HTML and JSON responses for clients that accept gzip or brotli"""
+    return compress_response(response, request.accept_encodings, COMPRESS_MIN_BYTES)
+
 @app.route('/')
 def index():
     """Render the main page"""
     languages = [(code, lang['name']) for code, lang in LANGUAGE_PACKS.items()]
     return render_template('index.html', languages=languages, LANGUAGE_PACKS=LANGUAGE_PACKS)
 
+def statement_period(data, statement_date):
+    """Return the (start, end) dates of the statement period, defaulting to the last 30 days"""
+    parse_date = DateParser()
+    period_end = parse_date(data['period_end']) if data.get('period_end') else statement_date
+    if data.get('period_start'):
+        period_start = parse_date(data['period_start'])
+    else:
+        period_start = period_end - datetime.timedelta(days=STATEMENT_PERIOD_DAYS - 1)
+    return period_start, period_end
+
+def statement_result(pdf_bytes, cached, keep_file=True, cache_key=None):
+    """Result of build_statement_pdf, adding the PDF to the statement store unless keep_file is False.
+
+    A cached statement reuses the file already stored for its cache key while
+    that file is still in the store.
+    """
+    if not keep_file:
+        return {'unique_id': str(uuid.uuid4()), 'output_path': None, 'pdf_bytes': pdf_bytes, 'cached': cached}
+    stored = statement_store.find(cache_key) if cached and cache_key else None
+    if stored is None:
+        stored = statement_store.put(pdf_bytes, content_key=cache_key)
+    unique_id, output_path = stored
+    return {'unique_id': unique_id, 'output_path': output_path, 'cached': cached}
+
+def download_url(unique_id):
+    """Signed download URL for a PDF in the statement store"""
+    return f"/download-statement/{download_tokens.issue(unique_id)}"
+
+def cardholder_statement_url(cardholder_id):
+    """Signed URL rendering statements from a cardholder's stored transactions"""
+    return f"/api/cardholders/{cardholder_tokens.issue(str(cardholder_id))}/statement"
+
+def statement_cache_key(data, language, statement_date, statement_values, transactions):
+    """Cache key for the document rendered from a request and its resolved statement content"""
+    return make_cache_key({
+        'language': language,
+        'statement_date': statement_date,
+        'cardholder': [
+            data.get('name'), data.get('card_number'), data.get('billing_address', DEFAULT_BILLING_ADDRESS),
+            data.get('email'), data.get('phone')
+        ],
+        'statement': statement_values,
+        'transactions': transactions
+    })
+
+def request_statement_values(data):
+    """Summary figures taken from the request payload"""
+    return {field: data.get(field, default) for field, default in STATEMENT_DEFAULTS.items()}
+
+def cardholder_values(data):
+    """Cardholder details from a request"""
+    return {
+        'name': data.get('name'),
+        'card_number': data.get('card_number'),
+        'billing_address': data.get('billing_address', DEFAULT_BILLING_ADDRESS),
+        'email': data.get('email'),
+        'phone': data.get('phone')
+    }
+
+def persist_statement(db_session, data, statement_date):
+    """Write the cardholder, transactions and statement for a validated request.
+
+    Returns (cardholder, statement, transactions), where transactions are the
+    records to render. Nothing is committed. Takes a plain Session so that
+    the async server can run it through AsyncSession.run_sync.
+    """
+    summary_mode = data.get('summary_mode', STATEMENT_SUMMARY_MODE)
+
+    # Reuse the cardholder row for this card number, creating it on first use
+    perf_logger.start('create_cardholder')
+    cardholder = upsert_cardholder(db_session, cardholder_values(data), cardholder_cache)
+    perf_logger.end('create_cardholder')
+
+    # Insert all transactions in a single round trip
+    perf_logger.start('create_transactions')
+
+    # Process input transactions
+    transaction_data = data.get('transactions', [])
+
+    # Log the number of transactions
+    if len(transaction_data) > 20:
+        logger.info(f"Processing large transaction set: {len(transaction_data)} transactions")
+
+    # Add some default transactions if none provided
+    if not transaction_data and summary_mode != 'ledger':
+        logger.debug("No transactions provided, adding default sample transactions")
+        transaction_data = DEFAULT_TRANSACTIONS
+
+    transactions = bulk_insert_transactions(db_session, cardholder.id, transaction_data)
+
+    # Let the memory governor decide whether a collection is needed
+    memory_governor.checkpoint()
+
+    perf_logger.end('create_transactions')
+
+    statement_values = request_statement_values(data)
+    if summary_mode == 'ledger':
+        perf_logger.start('compute_summary')
+        period_start, period_end = statement_period(data, statement_date)
+        statement_values = compute_statement_summary(
+            db_session, cardholder.id, period_start, period_end,
+            credit_limit=data.get('credit_limit'),
+            finance_charges=float(data.get('finance_charges', 0.0)),
+            default_credit_limit=STATEMENT_DEFAULTS['credit_limit']
+        )
+        # Carried over from the previous statement unless the request sets them
+        if 'reward_points' in data:
+            statement_values['reward_points'] = data['reward_points']
+        # Render every transaction the summary counts, not only the ones in this request
+        transactions = get_period_transactions(db_session, cardholder.id, period_start, period_end)
+        perf_logger.end('compute_summary')
+
+    # Create statement
+    perf_logger.start('create_statement')
+    statement = Statement(
+        cardholder_id=cardholder.id,
+        statement_date=statement_date,
+        payment_due_date=statement_date + datetime.timedelta(days=21),
+        **statement_values
+    )
+    db_session.add(statement)
+    db_session.flush()
+    perf_logger.end('create_statement')
+
+    return cardholder, statement, transactions
+
+def persisted_cache_key(data, language, statement, transactions):
+    """Cache key for a statement whose figures came from persist_statement"""
+    statement_values = {field: getattr(statement, field) for field in STATEMENT_DEFAULTS}
+    return statement_cache_key(
+        data, language, statement.statement_date, statement_values,
+        [(tx.date, tx.description, tx.amount) for tx in transactions]
+    )
+
+def statement_persistence_mode(data):
+    """Persistence mode for a request; ledger statements always persist first because they read stored data"""
+    if data.get('summary_mode', STATEMENT_SUMMARY_MODE) == 'ledger':
+        return 'sync'
+    return data.get('persistence', PERSISTENCE_MODE)
+
+def records_from_payload(data, statement_date):
+    """Build cardholder, statement and transaction records from a request without touching the database"""
+    cardholder = SimpleNamespace(**cardholder_values(data))
+    statement = SimpleNamespace(
+        statement_date=statement_date,
+        payment_due_date=statement_date + datetime.timedelta(days=21),
+        **request_statement_values(data)
+    )
+    transactions = [
+        SimpleNamespace(**row)
+        for row in build_transaction_rows(None, data.get('transactions') or DEFAULT_TRANSACTIONS)
+    ]
+    return cardholder, statement, transactions
+
+def persist_statements(items):
+    """Write a batch of (data, statement_date) items from the write-behind queue in one transaction"""
+    db_session = Session()
+    try:
+        cardholders = [persist_statement(db_session, data, statement_date)[0] for data, statement_date in items]
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+    for cardholder in cardholders:
+        cardholder_cache.put(cardholder)
+
+# Statements persisted after their PDF is rendered when PERSISTENCE_MODE is write_behind
+write_behind_queue = WriteBehindQueue(
+    persist_statements,
+    batch_size=int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 50)),
+    max_retries=int(os.environ.get('WRITE_BEHIND_MAX_RETRIES', 3)),
+    max_pending=int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 10000))
+)
+atexit.register(write_behind_queue.shutdown)
+
+def plan_statement(data, language):
+    """Settings for building a statement: its date, ledger mode, persistence mode and cache key.
+
+    The cache key is None in ledger mode, where it depends on stored data
+    and is only known once the statement is persisted (see persist_for_render).
+    """
+    statement_date = datetime.date.today()
+    ledger_mode = data.get('summary_mode', STATEMENT_SUMMARY_MODE) == 'ledger'
+    cache_key = None
+    if not ledger_mode:
+        cache_key = statement_cache_key(
+            data, language, statement_date, request_statement_values(data), data.get('transactions', [])
+        )
+    return SimpleNamespace(
+        statement_date=statement_date,
+        ledger_mode=ledger_mode,
+        persistence=statement_persistence_mode(data),
+        cache_key=cache_key
+    )
+
+def cached_statement(cache_key, keep_file=True):
+    """Result for a statement already in the PDF cache, or None on a miss"""
+    cached_pdf = pdf_cache.get(cache_key)
+    if cached_pdf is None:
+        return None
+    return statement_result(cached_pdf, True, keep_file, cache_key)
+
+def persist_for_render(db_session, data, language, plan):
+    """persist_statement for a planned statement, also returning its cache key.
+
+    Returns (cardholder, statement, transactions, cache_key). Nothing is
+    committed. Takes a plain Session so that the async server can run it
+    through AsyncSession.run_sync.
+    """
+    cardholder, statement, transactions = persist_statement(db_session, data, plan.statement_date)
+    cache_key = plan.cache_key
+    if plan.ledger_mode:
+        cache_key = persisted_cache_key(data, language, statement, transactions)
+    return cardholder, statement, transactions, cache_key
+
+def payload_records(data, plan):
+    """Records to render for a statement that is not persisted first, queueing it for write-behind if needed"""
+    records = records_from_payload(data, plan.statement_date)
+    if plan.persistence == 'write_behind':
+        write_behind_queue.submit((data, plan.statement_date))
+    return records
+
+def rendered_statement(pdf_bytes, keep_file, cache_key):
+    """Result for a newly rendered PDF, which is also added to the PDF cache"""
+    result = statement_result(pdf_bytes, False, keep_file, cache_key)
+    pdf_cache.put(cache_key, pdf_bytes)
+    return result
+
+def build_statement_pdf(data, language, keep_file=True):
+    """Persist the statement described by a validated request and render its PDF.
+
+    Returns the statement store id and path of the generated PDF, and the
+    cardholder id when the statement was persisted here. With
+    keep_file False nothing is written to disk and the result carries the
+    PDF bytes instead. It does not touch the Flask request or session, so
+    background jobs can run it too. asgi.build_statement_pdf_async follows
+    the same steps with async persistence and rendering.
+
+    With summary_mode 'ledger' the summary figures are computed from the
+    cardholder's stored transactions for the statement period, and the
+    period's stored transactions are rendered.
+
+    With persistence 'write_behind' the PDF is rendered straight from the
+    payload and the statement is queued for writing; with 'ephemeral'
+    nothing is written.
+    """
+    plan = plan_statement(data, language)
+
+    # Identical inputs on the same day render the same document, so serve those from the cache.
+    # Ledger statements depend on stored data, so they are looked up after the summary is computed.
+    if plan.cache_key is not None:
+        cached = cached_statement(plan.cache_key, keep_file)
+        if cached is not None:
+            return cached
+
+    if plan.persistence == 'sync':
+        # Create database session
+        db_session = Session()
+        try:
+            cardholder, statement, transactions, cache_key = persist_for_render(db_session, data, language, plan)
+            db_session.commit()
+        except Exception as e:
+            logger.error(f"Error generating statement: {str(e)}")
+            db_session.rollback()
+            raise
+        finally:
+            db_session.close()
+        cardholder_cache.put(cardholder)
+
+        if plan.ledger_mode:
+            cached = cached_statement(cache_key, keep_file)
+            if cached is not None:
+                return dict(cached, cardholder_id=cardholder.id)
+    else:
+        cardholder, statement, transactions = payload_records(data, plan)
+        cache_key = plan.cache_key
+
+    # Generate PDF
+    perf_logger.start('pdf_generation')
+
+    pdf_generator = StatementPDFGenerator(
+        statement, 
+        cardholder, 
+        transactions, 
+        language
+    )
+    pdf_bytes = pdf_generator.render_bytes()
+    result = rendered_statement(pdf_bytes, keep_file, cache_key)
+    if plan.persistence == 'sync':
+        result['cardholder_id'] = cardholder.id
+    perf_logger.end('pdf_generation')
+    
+    return result
+
+# Background workers for asynchronous statement generation
+job_queue = create_job_queue(lambda data: build_statement_pdf(data, data.get('language', 'en')))
+
+def validate_statement_request(data):
+    """Check a generate-statement payload, returning an error message or None"""
+    language = data.get('language', 'en')
+    
+    # Validate language
+    if language not in LANGUAGE_CODES:
+        return LANGUAGE_PACKS[language].get('invalid_language', 'Invalid language code')
+
+    if data.get('summary_mode', STATEMENT_SUMMARY_MODE) not in SUMMARY_MODES:
+        return 'Invalid summary mode'
+
+    if data.get('persistence', PERSISTENCE_MODE) not in PERSISTENCE_MODES:
+        return 'Invalid persistence mode'
+    
+    # Extract cardholder data
+    name = data.get('name')
+    card_number = data.get('card_number')
+    email = data.get('email')
+    phone = data.get('phone')
+    
+    # Get error messages in the selected language
+    error_messages = {
+        'missing_fields': LANGUAGE_PACKS[language].get('missing_fields', 'Missing required fields'),
+        'invalid_email': LANGUAGE_PACKS[language].get('invalid_email', 'Invalid email address'),
+        'invalid_card': LANGUAGE_PACKS[language].get('invalid_card', 'Invalid card number'),
+        'invalid_phone': LANGUAGE_PACKS[language].get('invalid_phone', 'Invalid phone number')
+    }
+    
+    # Validate required fields
+    if not all([name, card_number, email, phone]):
+        return error_messages['missing_fields']
+        
+    # Basic validation for email, card number and phone (could be enhanced)
+    if '@' not in email:
+        return error_messages['invalid_email']
+    return None
+
+def request_option(args, data, name):
+    """Whether a generate-statement flag such as async or stream is set in the query string or payload"""
+    return args.get(name) in ('1', 'true') or data.get(name) is True
+
+def queued_response(job_id):
+    """Response body for a statement queued on the job pool"""
+    return {
+        'success': True,
+        'message': 'Statement generation queued',
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}'
+    }
+
+def generated_response(result, performance_data):
+    """Response body for a generated statement"""
+    response = {
+        'success': True,
+        'message': 'Statement generated successfully',
+        'performance': performance_data,
+        'cached': result['cached'],
+        'download_url': download_url(result['unique_id'])
+    }
+    if result.get('cardholder_id') is not None:
+        response['cardholder_statement_url'] = cardholder_statement_url(result['cardholder_id'])
+    return response
+
 @app.route('/api/generate-statement', methods=['POST'])
+@perf_logger.track_request
 def generate_statement():
     """Generate a credit card statement PDF based on user input"""
     try:
@@ -57,205 +517,277 @@ def generate_statement():
         data = request.json
         language = data.get('language', 'en')
         
-        # Validate language
-        if language not in LANGUAGE_CODES:
-            return jsonify({'error': LANGUAGE_PACKS[language].get('invalid_language', 'Invalid language code')}), 400
+        error = validate_statement_request(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # Extract cardholder data
-        name = data.get('name')
-        card_number = data.get('card_number')
-        email = data.get('email')
-        phone = data.get('phone')
+        # Large statements can be rendered on the background job pool instead
+        if request_option(request.args, data, 'async'):
+            job_id = job_queue.submit(data)
+            perf_logger.end('generate_statement')
+            return jsonify(queued_response(job_id)), 202
         
-        # Get error messages in the selected language
-        error_messages = {
-            'missing_fields': LANGUAGE_PACKS[language].get('missing_fields', 'Missing required fields'),
-            'invalid_email': LANGUAGE_PACKS[language].get('invalid_email', 'Invalid email address'),
-            'invalid_card': LANGUAGE_PACKS[language].get('invalid_card', 'Invalid card number'),
-            'invalid_phone': LANGUAGE_PACKS[language].get('invalid_phone', 'Invalid phone number')
-        }
+        # Send the PDF itself, straight from memory, instead of a download URL
+        if request_option(request.args, data, 'stream'):
+            result = build_statement_pdf(data, language, keep_file=False)
+            perf_logger.end('generate_statement')
+            return send_statement(result['pdf_bytes'], f"credit_card_statement_{result['unique_id']}.pdf")
         
-        # Validate required fields
-        if not all([name, card_number, email, phone]):
-            return jsonify({'error': error_messages['missing_fields']}), 400
-            
-        # Basic validation for email, card number and phone (could be enhanced)
-        if '@' not in email:
-            return jsonify({'error': error_messages['invalid_email']}), 400
+        result = build_statement_pdf(data, language)
         
-        # Create database session
-        db_session = Session()
+        performance_data = perf_logger.get_metrics()
+        perf_logger.end('generate_statement')
         
-        try:
-            # Create cardholder
-            perf_logger.start('create_cardholder')
-            cardholder = Cardholder(
-                name=name,
-                card_number=card_number,
-                billing_address=data.get('billing_address', "D-45, Green Park,\nNew Delhi-110016, India"),
-                email=email,
-                phone=phone
-            )
-            db_session.add(cardholder)
-            db_session.commit()
-            perf_logger.end('create_cardholder')
+        return jsonify(generated_response(result, performance_data))
             
-            # Create transactions with batch processing for large datasets
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def upload_statement_data(args):
+    """Statement fields for an upload from its query parameters, converting the summary figures to numbers"""
+    data = args.to_dict()
+    for field, default in STATEMENT_DEFAULTS.items():
+        if field in data:
+            try:
+                data[field] = type(default)(data[field])
+            except ValueError:
+                raise UploadError(f"Invalid {field}")
+    return data
+
+@app.route('/api/upload-statement', methods=['POST'])
+@perf_logger.track_request
+def upload_statement():
+    """Generate a statement from an NDJSON or CSV upload of transactions.
+
+    Cardholder details, language, summary_mode and summary figures are
+    query parameters taking the same values as /api/generate-statement.
+    The body is validated row by row into a temporary spool file as it
+    arrives. Only once it has all been received are the rows inserted from
+    the spool, UPLOAD_CHUNK_SIZE at a time, in one short transaction, so a
+    slow upload never holds the database write lock. The PDF is rendered
+    from the spool too, so the transaction list is never held in memory.
+    Uploads are always stored, and nothing is stored if any row is invalid.
+
+    In ledger mode the period defaults to the dates covered by the upload.
+    """
+    upload_type = upload_format(request.mimetype)
+    if upload_type is None:
+        return jsonify({'error': 'Unsupported upload type, expected application/x-ndjson or text/csv'}), 415
+    try:
+        data = upload_statement_data(request.args)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), 400
+    language = data.get('language', 'en')
+
+    error = validate_statement_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    perf_logger.start('upload_statement')
+    statement_date = datetime.date.today()
+    ledger_mode = data.get('summary_mode', STATEMENT_SUMMARY_MODE) == 'ledger'
+    unique_id, partial_path = statement_store.new_file()
+
+    db_session = Session()
+    try:
+        with TransactionSpool() as spool:
+            perf_logger.start('receive_upload')
+            spool.extend(iter_upload(request.stream, upload_type))
+            perf_logger.end('receive_upload')
+
+            cardholder = upsert_cardholder(db_session, cardholder_values(data), cardholder_cache)
+
             perf_logger.start('create_transactions')
-            
-            # Process input transactions
-            transaction_data = data.get('transactions', [])
-            transactions = []
-            
-            # Define batch size for DB operations
-            batch_size = 50
-            total_transactions = len(transaction_data)
-            
-            # Log the number of transactions
-            if total_transactions > 20:
-                logger.info(f"Processing large transaction set: {total_transactions} transactions")
-            
-            # Process transactions in batches to handle large datasets efficiently
-            for i in range(0, total_transactions, batch_size):
-                batch = transaction_data[i:i+batch_size]
-                batch_transactions = []
-                
-                for tx_data in batch:
-                    # Parse date with fallback
-                    try:
-                        tx_date = datetime.datetime.strptime(tx_data.get('date', '2025-03-02'), '%Y-%m-%d').date()
-                    except ValueError:
-                        # Fallback to current date if format is invalid
-                        tx_date = datetime.date.today()
-                        
-                    # Create transaction object
-                    transaction = Transaction(
-                        cardholder_id=cardholder.id,
-                        date=tx_date,
-                        description=tx_data.get('description', 'Transaction'),
-                        amount=float(tx_data.get('amount', 0))
-                    )
-                    batch_transactions.append(transaction)
-                
-                # Add batch to DB and commit
-                if batch_transactions:
-                    db_session.add_all(batch_transactions)
-                    db_session.commit()
-                    transactions.extend(batch_transactions)
-                
-                # Force garbage collection after each batch
-                batch_transactions = None
-                gc.collect()
-            
-            # Add some default transactions if none provided
-            if not transactions:
-                logger.debug("No transactions provided, adding default sample transactions")
-                default_transactions = [
-                    Transaction(
-                        cardholder_id=cardholder.id,
-                        date=datetime.date(2025, 3, 2),
-                        description="Amazon India - Electronics",
-                        amount=3499.00
-                    ),
-                    Transaction(
-                        cardholder_id=cardholder.id,
-                        date=datetime.date(2025, 3, 2),
-                        description="Uber Ride - New Delhi",
-                        amount=285.50
-                    ),
-                    Transaction(
-                        cardholder_id=cardholder.id,
-                        date=datetime.date(2025, 3, 3),
-                        description="Big Bazaar - Grocery",
-                        amount=1230.75
-                    ),
-                    Transaction(
-                        cardholder_id=cardholder.id,
-                        date=datetime.date(2025, 3, 5),
-                        description="Mobile Recharge",
-                        amount=499.00
-                    )
-                ]
-                db_session.add_all(default_transactions)
-                db_session.commit()
-                transactions.extend(default_transactions)
-            
+            uploaded = ingest_transactions(
+                db_session, cardholder.id, spool.records(), chunk_size=UPLOAD_CHUNK_SIZE
+            )
+            memory_governor.checkpoint()
             perf_logger.end('create_transactions')
-            
-            # Create statement
-            perf_logger.start('create_statement')
+            logger.info(f"Ingested {uploaded['transaction_count']} uploaded transactions")
+
+            if ledger_mode:
+                perf_logger.start('compute_summary')
+                period = {}
+                if uploaded['first_date'] is not None:
+                    period = {'period_start': uploaded['first_date'].isoformat(),
+                              'period_end': uploaded['last_date'].isoformat()}
+                period.update({key: data[key] for key in ('period_start', 'period_end') if data.get(key)})
+                period_start, period_end = statement_period(period, statement_date)
+                totals = aggregate_transactions(db_session, [cardholder.id], period_start, period_end).get(cardholder.id)
+                statement_values = compute_statement_summary(
+                    db_session, cardholder.id, period_start, period_end,
+                    credit_limit=data.get('credit_limit'),
+                    finance_charges=data.get('finance_charges', 0.0),
+                    default_credit_limit=STATEMENT_DEFAULTS['credit_limit'],
+                    totals=totals
+                )
+                # Carried over from the previous statement unless the request sets them
+                if 'reward_points' in data:
+                    statement_values['reward_points'] = data['reward_points']
+                transactions = iter_period_transactions(db_session, cardholder.id, period_start, period_end)
+                transaction_count = totals['transaction_count'] if totals else 0
+                perf_logger.end('compute_summary')
+            else:
+                statement_values = request_statement_values(data)
+                transactions = spool
+                transaction_count = spool.count
+
             statement = Statement(
                 cardholder_id=cardholder.id,
-                statement_date=datetime.date.today(),
-                previous_balance=data.get('previous_balance', 13840.00),
-                payments_received=data.get('payments_received', 175.50),
-                purchases_charges=data.get('purchases_charges', 640.00),
-                finance_charges=data.get('finance_charges', 45.00),
-                new_balance=data.get('new_balance', 13935.50),
-                credit_limit=data.get('credit_limit', 175.00),
-                available_credit=data.get('available_credit', 1230.00),
-                payment_due_date=datetime.date.today() + datetime.timedelta(days=21),
-                reward_points=data.get('reward_points', 175)
+                statement_date=statement_date,
+                payment_due_date=statement_date + datetime.timedelta(days=21),
+                **statement_values
             )
             db_session.add(statement)
             db_session.commit()
-            perf_logger.end('create_statement')
-            
-            # Generate PDF
+            cardholder_cache.put(cardholder)
+
             perf_logger.start('pdf_generation')
-            
-            # Create a temporary file with a unique name
-            unique_id = str(uuid.uuid4())
-            temp_dir = tempfile.mkdtemp()
-            output_path = os.path.join(temp_dir, f'credit_card_statement_{unique_id}.pdf')
-            
             pdf_generator = StatementPDFGenerator(
-                statement, 
-                cardholder, 
-                transactions, 
-                language
+                statement, cardholder, transactions, language, transaction_count=transaction_count
             )
-            pdf_generator.generate_pdf(output_path)
+            pdf_generator.generate_pdf(partial_path)
+            statement_store.commit(unique_id)
             perf_logger.end('pdf_generation')
-            
-            # Store the generated PDF path in session for later retrieval
-            session['generated_pdf'] = output_path
-            
-            performance_data = perf_logger.get_metrics()
-            perf_logger.end('generate_statement')
-            
-            return jsonify({
-                'success': True, 
-                'message': 'Statement generated successfully',
-                'performance': performance_data,
-                'download_url': f'/download-statement/{unique_id}'
-            })
-            
-        except Exception as e:
-            logger.error(f"Error generating statement: {str(e)}")
-            db_session.rollback()
-            return jsonify({'error': str(e)}), 500
-        finally:
-            db_session.close()
-            
+    except UploadError as e:
+        db_session.rollback()
+        return jsonify({'error': str(e), 'line': e.line}), 400
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
+        logger.error(f"Error processing upload: {str(e)}")
+        db_session.rollback()
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db_session.close()
+
+    performance_data = perf_logger.get_metrics()
+    perf_logger.end('upload_statement')
+
+    return jsonify({
+        'success': True,
+        'message': 'Statement generated successfully',
+        'performance': performance_data,
+        'transaction_count': uploaded['transaction_count'],
+        'download_url': download_url(unique_id),
+        'cardholder_statement_url': cardholder_statement_url(cardholder.id)
+    })
+
+@app.route('/api/cardholders/<string:token>/statement')
+def cardholder_statement(token):
+    """Render a statement for a stored cardholder from their stored transactions.
+
+    The token is the signed one from the cardholder_statement_url returned
+    with a statement generated for the cardholder; bare cardholder ids are
+    not accepted, so statements cannot be fetched by enumerating ids.
+    Query parameters: from and to (YYYY-MM-DD, defaulting to the last 30
+    days) and language. Transactions are streamed from the database into
+    the PDF generator in batches rather than loaded as a list.
+    """
+    cardholder_id = cardholder_tokens.resolve(token)
+    if cardholder_id is None or not cardholder_id.isdigit():
+        return jsonify({'error': 'Cardholder not found'}), 404
+    cardholder_id = int(cardholder_id)
+
+    language = request.args.get('language', 'en')
+    if language not in LANGUAGE_CODES:
+        return jsonify({'error': 'Invalid language code'}), 400
+
+    statement_date = datetime.date.today()
+    try:
+        period_end = datetime.date.fromisoformat(request.args['to']) if request.args.get('to') else statement_date
+        if request.args.get('from'):
+            period_start = datetime.date.fromisoformat(request.args['from'])
+        else:
+            period_start = period_end - datetime.timedelta(days=STATEMENT_PERIOD_DAYS - 1)
+    except ValueError:
+        return jsonify({'error': 'Invalid date, expected YYYY-MM-DD'}), 400
+    if period_start > period_end:
+        return jsonify({'error': 'from must not be after to'}), 400
+
+    db_session = Session()
+    try:
+        cardholder = db_session.get(Cardholder, cardholder_id)
+        if cardholder is None:
+            return jsonify({'error': 'Cardholder not found'}), 404
+
+        perf_logger.start('compute_summary')
+        totals = aggregate_transactions(db_session, [cardholder_id], period_start, period_end).get(cardholder_id)
+        statement = SimpleNamespace(
+            statement_date=statement_date,
+            payment_due_date=statement_date + datetime.timedelta(days=21),
+            **compute_statement_summary(
+                db_session, cardholder_id, period_start, period_end,
+                default_credit_limit=STATEMENT_DEFAULTS['credit_limit'],
+                totals=totals
+            )
+        )
+        perf_logger.end('compute_summary')
+
+        perf_logger.start('pdf_generation')
+        unique_id, partial_path = statement_store.new_file()
+        pdf_generator = StatementPDFGenerator(
+            statement,
+            cardholder,
+            iter_period_transactions(db_session, cardholder_id, period_start, period_end),
+            language,
+            transaction_count=totals['transaction_count'] if totals else 0
+        )
+        pdf_generator.generate_pdf(partial_path)
+        output_path = statement_store.commit(unique_id)
+        perf_logger.end('pdf_generation')
+    except Exception as e:
+        logger.error(f"Error generating statement for cardholder {cardholder_id}: {str(e)}")
         return jsonify({'error': str(e)}), 500
+    finally:
+        db_session.close()
+
+    return send_statement(
+        output_path, f'credit_card_statement_{cardholder_id}_{period_start}_{period_end}.pdf', etag=unique_id
+    )
 
-@app.route('/download-statement/<string:unique_id>')
-def download_statement(unique_id):
-    """Download the generated PDF statement"""
-    pdf_path = session.get('generated_pdf')
+@app.route('/download-statement/<string:token>')
+def download_statement(token):
+    """Download a generated PDF statement, with ETag revalidation and resumable byte ranges.
+
+    The token is the signed one from the download URL returned when the
+    statement was generated; it names the PDF in the statement store.
+    """
+    unique_id = download_tokens.resolve(token)
+    pdf_path = statement_store.get_path(unique_id) if unique_id else None
     
-    if not pdf_path or not os.path.exists(pdf_path):
+    if pdf_path is None:
         return jsonify({'error': 'PDF not found or expired'}), 404
     
-    return send_file(
-        pdf_path,
-        as_attachment=True,
-        download_name=f'credit_card_statement_{unique_id}.pdf',
-        mimetype='application/pdf'
-    )
+    return send_statement(pdf_path, f'credit_card_statement_{unique_id}.pdf', etag=unique_id)
+
+@app.route('/api/jobs/<string:job_id>')
+def get_job(job_id):
+    """Return the status of an asynchronous statement job"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'error': job['error']
+    }
+    if job['status'] == JOB_SUCCEEDED:
+        response['download_url'] = download_url(job['result']['unique_id'])
+        if job['result'].get('cardholder_id') is not None:
+            response['cardholder_statement_url'] = cardholder_statement_url(job['result']['cardholder_id'])
+    return jsonify(response)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Return usage counters for the generated statement store and the PDF and preview caches"""
+    return jsonify({
+        'statement_store': statement_store.get_stats(),
+        'pdf_cache': pdf_cache.get_stats(),
+        'preview_cache': preview_cache.get_stats()
+    })
 
 @app.route('/api/languages')
 def get_languages():
@@ -263,9 +795,55 @@ def get_languages():
     languages = {code: {'name': lang['name']} for code, lang in LANGUAGE_PACKS.items()}
     return jsonify(languages)
 
+@app.template_filter('nl2br')
+def nl2br(value):
+    """Escape text and turn its line breaks into <br> tags"""
+    return Markup('<br>\n').join(str(value or '').splitlines())
+
+# Compiled once at startup; previews render it directly rather than through render_template
+preview_template = app.jinja_env.get_template('statement.html')
+
+# Preview transactions used when the request does not provide them
+PREVIEW_TRANSACTIONS = [
+    {'date': '02-Mar-2025', 'description': 'Amazon India - Electronics', 'amount': 3499.00},
+    {'date': '02-Mar-2025', 'description': 'Uber Ride - New Delhi', 'amount': 285.50}
+]
+
+def preview_number(value):
+    """Summary figures are rendered as floats, so 175, 175.0 and "175" preview the same"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+def preview_content(data):
+    """Template values for a preview with defaults applied, so equivalent payloads share a cache entry"""
+    today = datetime.date.today()
+    return {
+        'cardholder': {
+            'name': data.get('name', 'Sample Name'),
+            'card_number': data.get('card_number', 'XXXX-XXXX-XXXX-1234'),
+            'billing_address': data.get('billing_address', 'Sample Address'),
+            'email': data.get('email', 'sample@example.com'),
+            'phone': data.get('phone', '1234567890')
+        },
+        'statement': dict(
+            {field: preview_number(value) for field, value in request_statement_values(data).items()},
+            statement_date=today.strftime('%d-%b-%Y'),
+            payment_due_date=(today + datetime.timedelta(days=21)).strftime('%d-%b-%Y')
+        ),
+        'transactions': data.get('transactions', PREVIEW_TRANSACTIONS)
+    }
+
 @app.route('/preview-statement', methods=['POST'])
 def preview_statement():
-    """Generate a preview of the statement data"""
+    """Generate a preview of the statement data.
+
+    Rendered previews are cached by their normalised content. The response
+    ETag is that content's hash, so a request carrying it in If-None-Match
+    gets 304 without any rendering. Previews are POSTed, so browsers do not
+    revalidate them on their own; the page sends the last ETag back itself.
+    """
     try:
         data = request.json
         language = data.get('language', 'en')
@@ -274,45 +852,23 @@ def preview_statement():
         if language not in LANGUAGE_CODES:
             return jsonify({'error': 'Invalid language code'}), 400
         
-        language_pack = LANGUAGE_PACKS[language]
+        content = preview_content(data)
+        cache_key = make_cache_key(dict(content, language=language))
         
-        # Build statement data for preview
-        statement_data = {
-            'cardholder': {
-                'name': data.get('name', 'Sample Name'),
-                'card_number': data.get('card_number', 'XXXX-XXXX-XXXX-1234'),
-                'billing_address': data.get('billing_address', 'Sample Address'),
-                'email': data.get('email', 'sample@example.com'),
-                'phone': data.get('phone', '1234567890')
-            },
-            'statement': {
-                'statement_date': datetime.date.today().strftime('%d-%b-%Y'),
-                'previous_balance': data.get('previous_balance', 13840.00),
-                'payments_received': data.get('payments_received', 175.50),
-                'purchases_charges': data.get('purchases_charges', 640.00),
-                'finance_charges': data.get('finance_charges', 45.00),
-                'new_balance': data.get('new_balance', 13935.50),
-                'credit_limit': data.get('credit_limit', 175.00),
-                'available_credit': data.get('available_credit', 1230.00),
-                'payment_due_date': (datetime.date.today() + datetime.timedelta(days=21)).strftime('%d-%b-%Y'),
-                'reward_points': data.get('reward_points', 175)
-            },
-            'transactions': data.get('transactions', [
-                {
-                    'date': '02-Mar-2025',
-                    'description': 'Amazon India - Electronics',
-                    'amount': 3499.00
-                },
-                {
-                    'date': '02-Mar-2025',
-                    'description': 'Uber Ride - New Delhi',
-                    'amount': 285.50
-                }
-            ]),
-            'language': language_pack
-        }
+        if request.if_none_match.contains_weak(cache_key):
+            response = app.response_class(status=304)
+        else:
+            html = preview_cache.get(cache_key)
+            if html is None:
+                html = preview_template.render(language=LANGUAGE_PACKS[language], **content).encode('utf-8')
+                preview_cache.put(cache_key, html)
+            response = app.response_class(html, mimetype='text/html')
         
-        return render_template('statement.html', **statement_data)
+        # Weak: it names the preview content, which may be sent compressed or not
+        response.set_etag(cache_key, weak=True)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
         
     except Exception as e:
         logger.error(f"Error generating preview: {str(e)}")
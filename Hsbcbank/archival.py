@@ -0,0 +1,270 @@
+"""Hot/archive split for the transactions table.
+
+Transactions from closed billing cycles (calendar months older than
+ARCHIVE_AFTER_MONTHS) are moved out of the hot transactions table so that
+it, and its indexes, only hold recent activity. On PostgreSQL they go to
+the range-partitioned transactions_archive table (one partition per
+month); elsewhere each month gets its own transactions_archive_YYYY_MM
+table. Archived months are listed in transaction_archive_months.
+
+period_transactions() is the query layer: it reads the hot table and adds
+archive tables only for archived months that overlap the requested period.
+
+Run one pass manually with:
+
+    python archival.py
+"""
+import datetime
+import logging
+import os
+import threading
+from sqlalchemy import Column, Date, Float, Index, Integer, MetaData, String, Table
+from sqlalchemy import delete, func, insert, select, text, union_all
+from models import Transaction, TransactionArchiveMonth
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TABLE = 'transactions_archive'
+
+# Arbitrary key for the PostgreSQL advisory lock held while archiving
+ARCHIVE_LOCK_KEY = 7250414
+
+ARCHIVE_COLUMNS = ('id', 'cardholder_id', 'date', 'description', 'amount')
+
+archive_metadata = MetaData()
+_archive_tables = {}
+_archive_tables_lock = threading.Lock()
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(day, months):
+    """First day of the month that is months away from day's month"""
+    years, month_index = divmod(day.month - 1 + months, 12)
+    return datetime.date(day.year + years, month_index + 1, 1)
+
+
+def archive_table_name(month):
+    return f"{ARCHIVE_TABLE}_{month:%Y_%m}"
+
+
+def archive_table(name):
+    """Table object for an archive table, with the same columns as transactions"""
+    with _archive_tables_lock:
+        table = _archive_tables.get(name)
+        if table is None:
+            table = Table(
+                name, archive_metadata,
+                Column('id', Integer, primary_key=True, autoincrement=False),
+                Column('cardholder_id', Integer),
+                Column('date', Date),
+                Column('description', String(200)),
+                Column('amount', Float),
+                Index(f'ix_{name}_cardholder_id_date', 'cardholder_id', 'date')
+            )
+            _archive_tables[name] = table
+        return table
+
+
+def archived_tables_for_period(db_session, period_start, period_end):
+    """Archive tables holding archived months that overlap the period"""
+    table_names = db_session.execute(
+        select(TransactionArchiveMonth.table_name)
+        .where(
+            TransactionArchiveMonth.month >= month_start(period_start),
+            TransactionArchiveMonth.month <= period_end
+        )
+        .order_by(TransactionArchiveMonth.month)
+    ).scalars().all()
+    if not table_names:
+        return []
+    if db_session.connection().dialect.name == 'postgresql':
+        # Partition pruning picks the months out of the parent table
+        return [archive_table(ARCHIVE_TABLE)]
+    return [archive_table(name) for name in table_names]
+
+
+def period_transactions(db_session, cardholder_ids, period_start, period_end):
+    """Subquery of the cardholders' transactions for a period across hot and archived tables.
+
+    Filters are applied inside each branch so that every table's
+    (cardholder_id, date) index is used. Columns are id, cardholder_id,
+    date, description and amount.
+    """
+    tables = [Transaction.__table__] + archived_tables_for_period(db_session, period_start, period_end)
+    selects = [
+        select(*(table.c[name] for name in ARCHIVE_COLUMNS)).where(
+            table.c.cardholder_id.in_(cardholder_ids),
+            table.c.date >= period_start,
+            table.c.date <= period_end
+        )
+        for table in tables
+    ]
+    if len(selects) == 1:
+        return selects[0].subquery('period_transactions')
+    return union_all(*selects).subquery('period_transactions')
+
+
+def _prepare_month(connection, month):
+    """Create the archive table (or partition) for a month and register it, returning the insert target"""
+    name = archive_table_name(month)
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {ARCHIVE_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        target = archive_table(ARCHIVE_TABLE)
+    else:
+        target = archive_table(name)
+        target.create(connection, checkfirst=True)
+
+    registered = connection.execute(
+        select(TransactionArchiveMonth.month).where(TransactionArchiveMonth.month == month)
+    ).first()
+    if registered is None:
+        connection.execute(insert(TransactionArchiveMonth).values(
+            month=month,
+            table_name=name,
+            archived_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        ))
+    return target
+
+
+def archive_month(engine, month, batch_size=5000):
+    """Move one month of transactions from the hot table to its archive, returning the rows moved.
+
+    The month is registered before any rows move, so readers always union
+    its archive table once rows can be there. Each batch is copied and
+    deleted in one transaction.
+    """
+    hot = Transaction.__table__
+    next_month = add_months(month, 1)
+    with engine.begin() as connection:
+        has_rows = connection.execute(
+            select(hot.c.id).where(hot.c.date >= month, hot.c.date < next_month).limit(1)
+        ).first()
+        if has_rows is None:
+            return 0
+        target = _prepare_month(connection, month)
+
+    moved = 0
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(
+                select(hot.c.id)
+                .where(hot.c.date >= month, hot.c.date < next_month)
+                .order_by(hot.c.id)
+                .limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            columns = [hot.c[name] for name in ARCHIVE_COLUMNS]
+            connection.execute(insert(target).from_select(
+                list(ARCHIVE_COLUMNS), select(*columns).where(hot.c.id.in_(ids))
+            ))
+            connection.execute(delete(hot).where(hot.c.id.in_(ids)))
+        moved += len(ids)
+    return moved
+
+
+def _archive_before(engine, cutoff, batch_size):
+    hot = Transaction.__table__
+    with engine.connect() as connection:
+        oldest = connection.execute(select(func.min(hot.c.date)).where(hot.c.date < cutoff)).scalar()
+
+    results = {}
+    month = month_start(oldest) if oldest is not None else cutoff
+    while month < cutoff:
+        moved = archive_month(engine, month, batch_size)
+        if moved:
+            logger.info(f"Archived {moved} transactions from {month:%Y-%m}")
+            results[month] = moved
+        month = add_months(month, 1)
+    return results
+
+
+def archive_closed_cycles(engine, keep_months=3, batch_size=5000, today=None):
+    """Archive every month that ended more than keep_months months ago.
+
+    Returns {month: rows moved}. Late transactions dated in an already
+    archived month are moved on the next run.
+    """
+    cutoff = add_months(month_start(today or datetime.date.today()), -keep_months)
+    if engine.dialect.name != 'postgresql':
+        return _archive_before(engine, cutoff, batch_size)
+
+    with engine.connect() as lock_connection:
+        # Only one process archives at a time
+        locked = lock_connection.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {'key': ARCHIVE_LOCK_KEY}
+        ).scalar()
+        if not locked:
+            logger.info("Archival already running in another process")
+            return {}
+        try:
+            return _archive_before(engine, cutoff, batch_size)
+        finally:
+            lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': ARCHIVE_LOCK_KEY})
+            lock_connection.commit()
+
+
+class ArchivalWorker:
+    """Runs archive_closed_cycles periodically on a background thread"""
+
+    def __init__(self, engine, interval_seconds=3600, keep_months=3, batch_size=5000):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.keep_months = keep_months
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='transaction-archival', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                archive_closed_cycles(self.engine, self.keep_months, self.batch_size)
+            except Exception as e:
+                logger.error(f"Transaction archival failed: {str(e)}")
+            self._stop.wait(self.interval_seconds)
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def create_archival_worker(engine):
+    """Start the archival worker when ARCHIVE_ENABLED is set, otherwise return None"""
+    if os.environ.get('ARCHIVE_ENABLED', 'false').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    worker = ArchivalWorker(
+        engine,
+        interval_seconds=int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 3600)),
+        keep_months=int(os.environ.get('ARCHIVE_AFTER_MONTHS', 3)),
+        batch_size=int(os.environ.get('ARCHIVE_BATCH_SIZE', 5000))
+    )
+    logger.info(
+        f"Archiving transactions older than {worker.keep_months} months every {worker.interval_seconds} s"
+    )
+    return worker.start()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from database import create_configured_engine
+    from migrations import apply_migrations
+    from models import Base
+
+    archival_engine = create_configured_engine()
+    Base.metadata.create_all(archival_engine)
+    apply_migrations(archival_engine)
+    archive_closed_cycles(
+        archival_engine,
+        keep_months=int(os.environ.get('ARCHIVE_AFTER_MONTHS', 3)),
+        batch_size=int(os.environ.get('ARCHIVE_BATCH_SIZE', 5000))
+    )
@@ -0,0 +1,159 @@
+"""ASGI entry point.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+Statement generation is served by an async handler. Its database work runs
+on SQLAlchemy's asyncio engine, and PDF rendering runs in a bounded process
+pool, so the event loop is never blocked by a render. Every other route is
+the Flask app, run on a thread pool, so previews, language lookups and
+downloads keep being answered while renders are in flight.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+from app import (
+    app as flask_app, cached_statement, cardholder_cache, generated_response, job_queue, payload_records,
+    perf_logger, persist_for_render, plan_statement, queued_response, rendered_statement, request_option,
+    validate_statement_request
+)
+from bulk_renderer import create_worker_pool, job_from_models, render_job
+from database import create_async_configured_engine
+from downloads import pdf_etag
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 2))
+# Renders allowed to wait for a worker; further requests wait before queueing
+RENDER_MAX_PENDING = int(os.environ.get('RENDER_MAX_PENDING', RENDER_WORKERS * 4))
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 10))
+
+async_engine = create_async_configured_engine()
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+# Spawned workers do not inherit the server's threads or open connections
+render_pool = create_worker_pool(RENDER_WORKERS, multiprocessing.get_context('spawn'))
+render_slots = asyncio.Semaphore(RENDER_MAX_PENDING)
+
+
+async def render_pdf(job):
+    """Render a job from bulk_renderer.job_from_models on the process pool and return the PDF bytes"""
+    async with render_slots:
+        result = await asyncio.get_running_loop().run_in_executor(render_pool, render_job, None, job)
+    if not result.success:
+        raise RuntimeError(result.error)
+    return result.pdf_bytes
+
+
+async def build_statement_pdf_async(data, language, keep_file=True):
+    """Async counterpart of app.build_statement_pdf, sharing its steps"""
+    plan = plan_statement(data, language)
+
+    if plan.cache_key is not None:
+        cached = await asyncio.to_thread(cached_statement, plan.cache_key, keep_file)
+        if cached is not None:
+            return cached
+
+    if plan.persistence == 'sync':
+        async with AsyncSession() as db_session:
+            try:
+                cardholder, statement, transactions, cache_key = await db_session.run_sync(
+                    persist_for_render, data, language, plan
+                )
+                job = job_from_models(statement, cardholder, transactions, language)
+                await db_session.commit()
+            except Exception as e:
+                logger.error(f"Error generating statement: {str(e)}")
+                await db_session.rollback()
+                raise
+        cardholder_cache.put(cardholder)
+
+        if plan.ledger_mode:
+            cached = await asyncio.to_thread(cached_statement, cache_key, keep_file)
+            if cached is not None:
+                return dict(cached, cardholder_id=cardholder.id)
+    else:
+        # Only blocks when the write-behind queue is full and the write falls back to this call
+        cardholder, statement, transactions = await asyncio.to_thread(payload_records, data, plan)
+        job = job_from_models(statement, cardholder, transactions, language)
+        cache_key = plan.cache_key
+
+    perf_logger.start('pdf_generation')
+    pdf_bytes = await render_pdf(job)
+    result = await asyncio.to_thread(rendered_statement, pdf_bytes, keep_file, cache_key)
+    if plan.persistence == 'sync':
+        result['cardholder_id'] = cardholder.id
+    perf_logger.end('pdf_generation')
+
+    return result
+
+
+@perf_logger.track_request
+async def generate_statement(request):
+    """Generate a credit card statement PDF based on user input"""
+    if request.method != 'POST':
+        return JSONResponse({'error': 'Method not allowed'}, status_code=405)
+    try:
+        perf_logger.start('generate_statement')
+
+        data = await request.json()
+        language = data.get('language', 'en')
+
+        error = validate_statement_request(data)
+        if error:
+            return JSONResponse({'error': error}, status_code=400)
+
+        # Large statements can be rendered on the background job pool instead
+        if request_option(request.query_params, data, 'async'):
+            job_id = await asyncio.to_thread(job_queue.submit, data)
+            perf_logger.end('generate_statement')
+            return JSONResponse(queued_response(job_id), status_code=202)
+
+        # Send the PDF itself, straight from memory, instead of a download URL
+        if request_option(request.query_params, data, 'stream'):
+            result = await build_statement_pdf_async(data, language, keep_file=False)
+            perf_logger.end('generate_statement')
+            return Response(result['pdf_bytes'], media_type='application/pdf', headers={
+                'Content-Disposition': f"attachment; filename=credit_card_statement_{result['unique_id']}.pdf",
+                'ETag': f'"{pdf_etag(result["pdf_bytes"])}"',
+                'Cache-Control': 'no-cache, private'
+            })
+
+        result = await build_statement_pdf_async(data, language)
+
+        performance_data = perf_logger.get_metrics()
+        perf_logger.end('generate_statement')
+
+        return JSONResponse(generated_response(result, performance_data))
+
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(application):
+    yield
+    render_pool.shutdown(wait=False, cancel_futures=True)
+    await async_engine.dispose()
+
+
+application = Starlette(
+    routes=[
+        Route(
+            '/api/generate-statement', generate_statement, methods=['POST', 'OPTIONS'],
+            # Flask-CORS covers the Flask routes
+            middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+        ),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,172 @@
+"""Precompressed static assets and compression of dynamic responses.
+
+The build step copies the page's static assets to static/dist under
+content-hashed names (css/styles.3f2a9c1b7d4e.css) together with gzip and
+brotli variants, and writes
+static/dist/manifest.json mapping each source path to its hashed name:
+
+    python assets.py
+
+Templates link assets through asset_url(), which points at the hashed
+copy when the manifest has one and at the plain static file otherwise.
+Hashed copies never change, so they are served with far-future caching,
+picking the best variant the client accepts.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import shutil
+from flask import abort, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+if brotli is None:
+    # brotli is in the requirements; without it everything still works, with gzip only
+    logger.warning("brotli is not installed, assets and responses are compressed with gzip only")
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_NAME = 'manifest.json'
+
+# Static files referenced by the templates
+ASSETS = (
+    'css/styles.css',
+    'js/main.js',
+    'fonts/font_loader.js',
+    'img/hsbc-logo.svg',
+)
+
+# Hashed asset names never change content
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Responses compressed on the fly
+COMPRESSIBLE_MIMETYPES = ('text/html', 'application/json')
+
+# Content-Encoding to file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def hashed_name(path, content):
+    """Name of an asset with a hash of its content before the extension"""
+    root, extension = os.path.splitext(path)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output_file:
+        output_file.write(content)
+
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR, assets=ASSETS):
+    """Write hashed copies of the assets with their compressed variants and the manifest.
+
+    Returns the manifest. The dist directory is rebuilt from scratch.
+    """
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    for path in assets:
+        with open(os.path.join(static_dir, path), 'rb') as source:
+            content = source.read()
+        name = hashed_name(path, content)
+        target = os.path.join(dist_dir, name)
+        _write(target, content)
+        # mtime=0 keeps the gzip output identical between builds
+        _write(target + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(target + '.br', brotli.compress(content, quality=11))
+        manifest[path] = name
+        logger.info(f"Built {name}")
+
+    if brotli is None:
+        logger.warning("brotli is not installed, only gzip variants were built")
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(dist_dir=DIST_DIR):
+    """Source path -> hashed name from the last build, or {} if assets were never built"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+
+
+def accepted_encoding(accept_encodings, available=('br', 'gzip')):
+    """Best Content-Encoding from available that the client accepts, or None.
+
+    accept_encodings is a werkzeug Accept object (request.accept_encodings).
+    """
+    for encoding, _ in ENCODINGS:
+        if encoding in available and accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def send_asset(name, accept_encodings, dist_dir=DIST_DIR):
+    """Send a hashed asset with far-future caching, preferring a precompressed variant the client accepts"""
+    path = safe_join(dist_dir, name)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    available = [encoding for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)]
+    encoding = accepted_encoding(accept_encodings, available)
+    suffix = dict(ENCODINGS)[encoding] if encoding else ''
+
+    response = send_from_directory(
+        dist_dir, name + suffix,
+        mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+        max_age=IMMUTABLE_MAX_AGE
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        # Quality 5 is close to gzip's speed with a better ratio
+        return brotli.compress(content, quality=5)
+    return gzip.compress(content, compresslevel=6)
+
+
+def compress_response(response, accept_encodings, min_bytes=1024):
+    """Compress an HTML or JSON response in place when it is large enough and the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    encoding = accepted_encoding(accept_encodings, ('br', 'gzip') if brotli is not None else ('gzip',))
+    if encoding is None:
+        return response
+
+    response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag names the exact bytes, which differ per encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    build_assets()
@@ -0,0 +1,157 @@
+import logging
+import os
+import time
+import datetime
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# Outcome of a single job. pdf_bytes is only set for jobs without an output_path.
+BulkRenderResult = namedtuple(
+    'BulkRenderResult',
+    ['job_id', 'output_path', 'success', 'error', 'bytes_written', 'duration_ms', 'pdf_bytes']
+)
+
+STATEMENT_FIELDS = [
+    'statement_date', 'previous_balance', 'payments_received', 'purchases_charges',
+    'finance_charges', 'new_balance', 'credit_limit', 'available_credit',
+    'payment_due_date', 'reward_points'
+]
+CARDHOLDER_FIELDS = ['name', 'card_number', 'billing_address', 'email', 'phone']
+TRANSACTION_FIELDS = ['date', 'description', 'amount']
+DATE_FIELDS = ('statement_date', 'payment_due_date', 'date')
+
+
+def job_from_models(statement, cardholder, transactions, language='en', output_path=None, job_id=None):
+    """Build a picklable job description from ORM (or ORM-like) objects"""
+    return {
+        'job_id': job_id,
+        'language': language,
+        'output_path': output_path,
+        'statement': {field: getattr(statement, field) for field in STATEMENT_FIELDS},
+        'cardholder': {field: getattr(cardholder, field) for field in CARDHOLDER_FIELDS},
+        'transactions': [
+            {field: getattr(trans, field) for field in TRANSACTION_FIELDS}
+            for trans in transactions
+        ],
+    }
+
+
+def _as_record(data):
+    """Turn a job dict into an attribute-access record, parsing ISO dates"""
+    values = dict(data)
+    for field in DATE_FIELDS:
+        if isinstance(values.get(field), str):
+            values[field] = datetime.date.fromisoformat(values[field])
+    return SimpleNamespace(**values)
+
+
+def _init_worker():
+    """Process pool initializer: register fonts once per worker process"""
+    from pdf_fonts import register_fonts
+    register_fonts()
+
+
+def render_job(job_id, job):
+    """Render one job inside a worker process; never raises"""
+    from pdf_generator import StatementPDFGenerator
+
+    start_time = time.time()
+    output_path = job.get('output_path')
+    try:
+        generator = StatementPDFGenerator(
+            _as_record(job['statement']),
+            _as_record(job['cardholder']),
+            [_as_record(trans) for trans in job.get('transactions', [])],
+            job.get('language', 'en')
+        )
+        if output_path:
+            generator.generate_pdf(output_path)
+            bytes_written = os.path.getsize(output_path)
+            pdf_bytes = None
+        else:
+            pdf_bytes = generator.render_bytes()
+            bytes_written = len(pdf_bytes)
+        duration_ms = round((time.time() - start_time) * 1000, 2)
+        return BulkRenderResult(job_id, output_path, True, None, bytes_written, duration_ms, pdf_bytes)
+    except Exception as e:
+        duration_ms = round((time.time() - start_time) * 1000, 2)
+        return BulkRenderResult(job_id, output_path, False, f"{type(e).__name__}: {e}", 0, duration_ms, None)
+
+
+def create_worker_pool(max_workers=None, mp_context=None):
+    """Process pool for render_job whose workers have the fonts registered"""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, mp_context=mp_context)
+
+
+class BulkStatementRenderer:
+    """Render many statements across a pool of worker processes.
+
+    Jobs are dicts as produced by job_from_models. Results are yielded in
+    completion order, and at most max_in_flight jobs are submitted at a time
+    so that very large (or lazily generated) job lists do not pile up in memory.
+    A failing job produces a failed result instead of stopping the run.
+    """
+
+    def __init__(self, max_workers=None, max_in_flight=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+        self.executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """Start the worker pool"""
+        if self.executor is None:
+            self.executor = create_worker_pool(self.max_workers)
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def render(self, jobs):
+        """Render an iterable of jobs, yielding a BulkRenderResult per job as it completes"""
+        self.start()
+        jobs = iter(jobs)
+        in_flight = {}
+        job_counter = 0
+        exhausted = False
+
+        while True:
+            # Top up the in-flight window
+            while not exhausted and len(in_flight) < self.max_in_flight:
+                try:
+                    job = next(jobs)
+                except StopIteration:
+                    exhausted = True
+                    break
+                job_id = job.get('job_id')
+                if job_id is None:
+                    job_id = job_counter
+                job_counter += 1
+                in_flight[self.executor.submit(render_job, job_id, job)] = (job_id, job.get('output_path'))
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id, output_path = in_flight.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Failures outside the job itself (e.g. a worker crash)
+                    logger.error(f"Bulk render job {job_id} failed: {str(e)}")
+                    result = BulkRenderResult(job_id, output_path, False, f"{type(e).__name__}: {e}", 0, 0, None)
+                if not result.success:
+                    logger.warning(f"Bulk render job {job_id} failed: {result.error}")
+                yield result
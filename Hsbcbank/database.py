@@ -0,0 +1,134 @@
+import logging
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+# asyncio drivers used by the ASGI server for each backend
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def resolve_database_uri(database_uri=None):
+    """Return the database URI from the argument or DATABASE_URL, falling back to SQLite"""
+    database_uri = database_uri or os.environ.get('DATABASE_URL')
+    if database_uri is None:
+        # Fallback to SQLite for local development
+        database_uri = 'sqlite:///credit_card.db'
+        logger.warning("No DATABASE_URL found, using SQLite instead")
+
+    # For PostgreSQL from SQLAlchemy 1.4.x
+    if database_uri.startswith("postgres://"):
+        database_uri = database_uri.replace("postgres://", "postgresql://", 1)
+    return database_uri
+
+
+def get_engine_config(database_uri):
+    """Read pool and SQLite settings from the environment.
+
+    Pool sizes apply per process, so with gunicorn the total number of
+    connections is workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    """
+    url = make_url(database_uri)
+    config = {'pool': {}, 'sqlite_pragmas': {}}
+
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    in_memory = is_sqlite and url.database in (None, '', ':memory:')
+
+    # In-memory SQLite uses a single connection pool that takes no sizing arguments
+    if not in_memory:
+        config['pool'] = {
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        }
+
+    if is_sqlite:
+        journal_mode = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+        synchronous = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+        if journal_mode not in SQLITE_JOURNAL_MODES:
+            raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {journal_mode}")
+        if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {synchronous}")
+
+        pragmas = {
+            'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+            'synchronous': synchronous,
+            'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        }
+        # WAL needs a database file
+        if not in_memory:
+            pragmas['journal_mode'] = journal_mode
+        config['sqlite_pragmas'] = pragmas
+
+    return config
+
+
+def _apply_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_configured_engine(database_uri=None):
+    """Create the SQLAlchemy engine with pool settings and SQLite pragmas applied"""
+    database_uri = resolve_database_uri(database_uri)
+    config = get_engine_config(database_uri)
+
+    engine = create_engine(database_uri, **config['pool'])
+    if config['sqlite_pragmas']:
+        _apply_sqlite_pragmas(engine, config['sqlite_pragmas'])
+
+    logger.info(
+        f"Database engine: {engine.url.render_as_string(hide_password=True)} "
+        f"pool={config['pool'] or 'default'} sqlite_pragmas={config['sqlite_pragmas'] or 'none'}"
+    )
+    return engine
+
+
+def to_async_uri(database_uri):
+    """Return the database URI with the backend's asyncio driver"""
+    url = make_url(database_uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver configured for {backend}")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_configured_engine(database_uri=None):
+    """Create an asyncio engine with the same pool settings and SQLite pragmas as the sync engine"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    database_uri = resolve_database_uri(database_uri)
+    config = get_engine_config(database_uri)
+
+    engine = create_async_engine(to_async_uri(database_uri), **config['pool'])
+    if config['sqlite_pragmas']:
+        _apply_sqlite_pragmas(engine.sync_engine, config['sqlite_pragmas'])
+
+    logger.info(
+        f"Async database engine: {engine.url.render_as_string(hide_password=True)} "
+        f"pool={config['pool'] or 'default'} sqlite_pragmas={config['sqlite_pragmas'] or 'none'}"
+    )
+    return engine
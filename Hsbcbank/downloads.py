@@ -0,0 +1,79 @@
+"""Sending statement PDFs with validators and byte ranges.
+
+Every response carries an ETag and Accept-Ranges, so a client can
+revalidate with If-None-Match and resume an interrupted download with
+Range (and If-Range). Files on disk go out through the WSGI server's
+file_wrapper (sendfile under gunicorn), or, with USE_X_SENDFILE, are left
+to the front-end server. PDFs rendered in memory are sent from their bytes
+with an ETag derived from the content. Stored files never change once
+written, so they are sent with their store id as the ETag rather than
+one derived from their modification time, which the store bumps when it
+renews a file.
+
+Download URLs carry a signed, expiring token naming the statement, so any
+worker or node that shares the statement store directory and secret key
+can serve them without sticky sessions. The same tokens, with their own
+salt, name the cardholder in cardholder statement URLs.
+"""
+import hashlib
+import io
+from flask import send_file
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+
+def pdf_etag(pdf_bytes):
+    """Strong ETag for a rendered PDF"""
+    return hashlib.sha256(pdf_bytes).hexdigest()[:32]
+
+
+def send_statement(source, download_name, etag=None):
+    """Send a statement PDF from a file path or from bytes, honouring conditional and range requests.
+
+    etag is a stable ETag for a file that never changes, such as its
+    statement store id; without one a file's ETag comes from its mtime and size.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        response = send_file(
+            io.BytesIO(source),
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=download_name,
+            etag=pdf_etag(source),
+            conditional=True
+        )
+    else:
+        response = send_file(
+            source,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=download_name,
+            etag=etag if etag is not None else True,
+            conditional=True
+        )
+    # Statements are personal: the browser may keep a copy but must revalidate it, shared caches may not store it
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+class DownloadTokens:
+    """Signed tokens naming a statement store id, valid for max_age seconds.
+
+    Tokens signed with one salt are rejected under any other, so tokens for
+    different kinds of URL cannot be swapped.
+    """
+
+    def __init__(self, secret_key, max_age, salt='statement-download'):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt=salt)
+
+    def issue(self, unique_id):
+        return self._serializer.dumps(unique_id)
+
+    def resolve(self, token):
+        """Return the id in a token, or None if it is forged, malformed or expired"""
+        try:
+            unique_id = self._serializer.loads(token, max_age=self.max_age)
+        except BadSignature:
+            return None
+        return unique_id if isinstance(unique_id, str) else None
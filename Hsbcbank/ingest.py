@@ -0,0 +1,215 @@
+"""Incremental parsing of uploaded transaction files.
+
+Uploads are NDJSON (one JSON object per line) or CSV with a header row
+naming the date, description and amount columns. Rows are read from the
+request stream and validated one at a time into a temporary spool file,
+then inserted from the spool in chunks and rendered from it, so memory
+use depends on the chunk size rather than on the size of the upload.
+Reading the spool back instead of the request keeps database writes out
+of the time spent receiving a slow upload.
+"""
+import csv
+import datetime
+import io
+import json
+import logging
+import math
+import tempfile
+from types import SimpleNamespace
+from repository import insert_transaction_rows
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+}
+
+# Longest accepted NDJSON line, in characters
+MAX_LINE_LENGTH = 64 * 1024
+
+# Length of the transactions.description column
+DESCRIPTION_MAX_LENGTH = 200
+
+
+class UploadError(ValueError):
+    """An upload that cannot be parsed; line is the 1-based line number when known"""
+
+    def __init__(self, message, line=None):
+        self.line = line
+        super().__init__(f"Line {line}: {message}" if line else message)
+
+
+def upload_format(mimetype):
+    """Return 'ndjson' or 'csv' for an upload content type, or None if unsupported"""
+    return UPLOAD_FORMATS.get((mimetype or '').lower())
+
+
+def parse_transaction(fields, line=None):
+    """Validate one uploaded transaction and return its date, description and amount.
+
+    Unlike the JSON endpoint, which falls back to defaults, a missing or
+    malformed date or amount is an error.
+    """
+    raw_date = fields.get('date')
+    try:
+        date = datetime.date.fromisoformat(raw_date)
+    except (TypeError, ValueError):
+        raise UploadError(f"invalid date {raw_date!r}, expected YYYY-MM-DD", line)
+
+    raw_amount = fields.get('amount')
+    if isinstance(raw_amount, bool) or raw_amount in (None, ''):
+        raise UploadError(f"invalid amount {raw_amount!r}", line)
+    try:
+        amount = float(raw_amount)
+    except (TypeError, ValueError):
+        raise UploadError(f"invalid amount {raw_amount!r}", line)
+    if not math.isfinite(amount):
+        raise UploadError(f"invalid amount {raw_amount!r}", line)
+
+    description = fields.get('description')
+    if description in (None, ''):
+        description = 'Transaction'
+    elif not isinstance(description, str):
+        raise UploadError("description must be a string", line)
+    elif len(description) > DESCRIPTION_MAX_LENGTH:
+        raise UploadError(f"description longer than {DESCRIPTION_MAX_LENGTH} characters", line)
+
+    return {'date': date, 'description': description, 'amount': amount}
+
+
+def _text_stream(stream):
+    return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+
+
+def iter_ndjson(stream):
+    """Yield validated transactions from a binary NDJSON stream; blank lines are skipped"""
+    text = _text_stream(stream)
+    line_number = 0
+    try:
+        while True:
+            line = text.readline(MAX_LINE_LENGTH + 1)
+            if not line:
+                break
+            line_number += 1
+            if len(line) > MAX_LINE_LENGTH:
+                raise UploadError(f"line longer than {MAX_LINE_LENGTH} characters", line_number)
+            if not line.strip():
+                continue
+            try:
+                fields = json.loads(line)
+            except ValueError:
+                raise UploadError("invalid JSON", line_number)
+            if not isinstance(fields, dict):
+                raise UploadError("expected a JSON object", line_number)
+            yield parse_transaction(fields, line_number)
+    except UnicodeDecodeError:
+        raise UploadError("upload is not valid UTF-8", line_number + 1)
+
+
+def iter_csv(stream):
+    """Yield validated transactions from a binary CSV stream with a header row"""
+    reader = csv.DictReader(_text_stream(stream))
+    try:
+        fieldnames = reader.fieldnames
+        if not fieldnames or not {'date', 'amount'} <= set(fieldnames):
+            raise UploadError("CSV header must name date and amount columns", 1)
+        for fields in reader:
+            yield parse_transaction(fields, reader.line_num)
+    except csv.Error as e:
+        raise UploadError(f"invalid CSV: {str(e)}", reader.line_num)
+    except UnicodeDecodeError:
+        raise UploadError("upload is not valid UTF-8", reader.line_num + 1)
+
+
+def iter_upload(stream, upload_type):
+    """Yield validated transactions from an upload of the given format"""
+    if upload_type == 'csv':
+        return iter_csv(stream)
+    return iter_ndjson(stream)
+
+
+class TransactionSpool:
+    """Temporary file of validated transactions that can be read back for rendering"""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile('w+', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self.count = 0
+
+    def append(self, transaction):
+        self._writer.writerow([transaction['date'].isoformat(), transaction['description'], transaction['amount']])
+        self.count += 1
+
+    def extend(self, transactions):
+        """Append every transaction, returning the spool; stops at the first invalid row"""
+        for transaction in transactions:
+            self.append(transaction)
+        return self
+
+    def records(self):
+        """Spooled transactions as dicts, in the shape ingest_transactions takes"""
+        self._file.flush()
+        self._file.seek(0)
+        for date, description, amount in csv.reader(self._file):
+            yield {'date': datetime.date.fromisoformat(date), 'description': description, 'amount': float(amount)}
+
+    def __iter__(self):
+        for record in self.records():
+            yield SimpleNamespace(**record)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def ingest_transactions(db_session, cardholder_id, transactions, chunk_size=1000, spool=None):
+    """Insert validated transactions for a cardholder chunk_size rows at a time.
+
+    Every transaction is also appended to spool when one is given. Nothing
+    is committed, so a bad row part way through leaves nothing behind once
+    the caller rolls back. Returns the transaction count, purchase and
+    payment totals and the first and last dates seen.
+    """
+    totals = {
+        'transaction_count': 0, 'purchases_charges': 0.0, 'payments_received': 0.0,
+        'first_date': None, 'last_date': None
+    }
+    chunk = []
+
+    def flush_chunk():
+        insert_transaction_rows(db_session, chunk)
+        logger.debug(f"Inserted {len(chunk)} uploaded transactions")
+        chunk.clear()
+
+    for transaction in transactions:
+        chunk.append(dict(transaction, cardholder_id=cardholder_id))
+        if spool is not None:
+            spool.append(transaction)
+
+        amount, date = transaction['amount'], transaction['date']
+        totals['transaction_count'] += 1
+        if amount > 0:
+            totals['purchases_charges'] += amount
+        elif amount < 0:
+            totals['payments_received'] -= amount
+        if totals['first_date'] is None or date < totals['first_date']:
+            totals['first_date'] = date
+        if totals['last_date'] is None or date > totals['last_date']:
+            totals['last_date'] = date
+
+        if len(chunk) >= chunk_size:
+            flush_chunk()
+    if chunk:
+        flush_chunk()
+
+    totals['purchases_charges'] = round(totals['purchases_charges'], 2)
+    totals['payments_received'] = round(totals['payments_received'], 2)
+    return totals
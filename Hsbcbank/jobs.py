@@ -0,0 +1,325 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils import ensure_private_dir
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+
+
+class JobQueue:
+    """Base class for background statement jobs.
+
+    handler(payload) runs on a background worker and returns a JSON
+    serialisable result. Job records are dicts with job_id, status,
+    created_at, updated_at, result and error.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def submit(self, payload):
+        """Queue a payload and return its job id"""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return the job record, or None if the job is unknown"""
+        raise NotImplementedError
+
+    def shutdown(self):
+        """Stop the background workers"""
+
+    def _new_record(self, job_id):
+        now = time.time()
+        return {
+            'job_id': job_id,
+            'status': JOB_QUEUED,
+            'created_at': now,
+            'updated_at': now,
+            'result': None,
+            'error': None
+        }
+
+    def _execute(self, job_id, payload):
+        """Run the handler for a job and record its outcome"""
+        self._update(job_id, status=JOB_RUNNING)
+        try:
+            result = self.handler(payload)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+        else:
+            self._update(job_id, status=JOB_SUCCEEDED, result=result)
+
+    def _update(self, job_id, **changes):
+        raise NotImplementedError
+
+
+class InProcessJobQueue(JobQueue):
+    """Jobs run on a thread pool inside the current process.
+
+    Only the process that accepted a job knows about it, so status polls
+    that reach another worker process get 404; use it only with a single
+    worker. Only the most recent max_records jobs are kept.
+    """
+
+    def __init__(self, handler, max_workers=2, max_records=1000):
+        super().__init__(handler)
+        self.max_records = max_records
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='statement-job')
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._records[job_id] = self._new_record(job_id)
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+        self._executor.submit(self._execute, job_id, payload)
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._records.get(job_id)
+            return dict(record) if record is not None else None
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            record = self._records.get(job_id)
+            if record is not None:
+                record.update(changes, updated_at=time.time())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+class SpoolJobQueue(JobQueue):
+    """Local broker stand-in backed by a spool directory.
+
+    Payloads are written to queue/ and claimed by atomically renaming them
+    into running/, so every process polling the same directory (e.g. all
+    gunicorn workers on a host) can pick up work and report status. Job
+    records live in status/ as JSON files.
+
+    A maintenance thread touches the running/ files this process claimed
+    every few seconds. A running/ file nobody has touched for stale_seconds
+    belongs to a worker that died, so it is requeued, or failed once it has
+    been claimed max_attempts times. Status records of finished jobs are
+    deleted record_ttl_seconds after their last update.
+    """
+
+    def __init__(self, handler, spool_dir, max_workers=2, poll_interval=0.2,
+                 stale_seconds=300, max_attempts=3, record_ttl_seconds=86400):
+        super().__init__(handler)
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self.record_ttl_seconds = record_ttl_seconds
+        self.queue_dir = os.path.join(spool_dir, 'queue')
+        self.running_dir = os.path.join(spool_dir, 'running')
+        self.status_dir = os.path.join(spool_dir, 'status')
+        # Payloads hold cardholder details
+        for path in (spool_dir, self.queue_dir, self.running_dir, self.status_dir):
+            ensure_private_dir(path)
+
+        # running/ files claimed by this process, kept fresh by the maintenance thread
+        self._claimed = set()
+        self._claimed_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, name=f'statement-spool-{i}', daemon=True)
+            for i in range(max_workers)
+        ]
+        self._threads.append(
+            threading.Thread(target=self._maintenance_loop, name='statement-spool-maintenance', daemon=True)
+        )
+        for thread in self._threads:
+            thread.start()
+
+    def _write_json(self, directory, filename, data):
+        # Write then rename so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as temp_file:
+            json.dump(data, temp_file)
+        os.replace(temp_path, os.path.join(directory, filename))
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        self._write_json(self.status_dir, f'{job_id}.json', self._new_record(job_id))
+        # Time prefix keeps the queue roughly first in, first out
+        self._write_json(self.queue_dir, f'{time.time():020.6f}_{job_id}.json', payload)
+        return job_id
+
+    def get(self, job_id):
+        try:
+            with open(os.path.join(self.status_dir, f'{job_id}.json')) as status_file:
+                return json.load(status_file)
+        except (OSError, ValueError):
+            return None
+
+    def _update(self, job_id, **changes):
+        record = self.get(job_id) or self._new_record(job_id)
+        record.update(changes, updated_at=time.time())
+        self._write_json(self.status_dir, f'{job_id}.json', record)
+
+    @staticmethod
+    def _job_id(filename):
+        return filename[:-len('.json')].split('_', 1)[1]
+
+    def _claim(self):
+        """Claim the oldest queued job, returning (job_id, payload, running_path) or None"""
+        for filename in sorted(os.listdir(self.queue_dir)):
+            if not filename.endswith('.json'):
+                continue
+            running_path = os.path.join(self.running_dir, filename)
+            try:
+                os.rename(os.path.join(self.queue_dir, filename), running_path)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+            with self._claimed_lock:
+                self._claimed.add(running_path)
+            # The payload kept its submit time; the claim starts the stale clock
+            os.utime(running_path)
+            with open(running_path) as payload_file:
+                payload = json.load(payload_file)
+            job_id = self._job_id(filename)
+            record = self.get(job_id) or {}
+            self._update(job_id, attempts=record.get('attempts', 0) + 1)
+            return job_id, payload, running_path
+        return None
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self._claim()
+            except Exception as e:
+                logger.error(f"Could not claim spooled job: {str(e)}")
+                claimed = None
+
+            if claimed is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            job_id, payload, running_path = claimed
+            try:
+                self._execute(job_id, payload)
+            finally:
+                with self._claimed_lock:
+                    self._claimed.discard(running_path)
+                try:
+                    os.unlink(running_path)
+                except FileNotFoundError:
+                    pass
+
+    def _heartbeat(self):
+        """Touch the running/ files this process is working on"""
+        with self._claimed_lock:
+            claimed = list(self._claimed)
+        for path in claimed:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, now=None):
+        """Requeue or fail stale claims and delete expired status records.
+
+        Returns the number of jobs requeued and failed and of records pruned.
+        """
+        now = now or time.time()
+        requeued = 0
+        failed = 0
+        pruned = 0
+
+        for entry in os.scandir(self.running_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            # Renaming a file updates its ctime, so a fresh claim is never stale
+            if now - max(stat.st_mtime, stat.st_ctime) <= self.stale_seconds:
+                continue
+            job_id = self._job_id(entry.name)
+            attempts = (self.get(job_id) or {}).get('attempts', 0)
+            try:
+                if attempts < self.max_attempts:
+                    self._update(job_id, status=JOB_QUEUED)
+                    os.rename(entry.path, os.path.join(self.queue_dir, entry.name))
+                    requeued += 1
+                else:
+                    os.unlink(entry.path)
+                    self._update(job_id, status=JOB_FAILED,
+                                 error=f"Worker stopped while running the job ({attempts} attempts)")
+                    failed += 1
+            except FileNotFoundError:
+                # Finished, or already handled by another process
+                continue
+            logger.warning(f"Job {job_id} was abandoned by its worker after {attempts} attempts")
+
+        for entry in os.scandir(self.status_dir):
+            try:
+                if now - entry.stat().st_mtime <= self.record_ttl_seconds:
+                    continue
+                if entry.name.endswith('.json'):
+                    with open(entry.path) as status_file:
+                        if json.load(status_file).get('status') not in (JOB_SUCCEEDED, JOB_FAILED):
+                            continue
+                os.unlink(entry.path)
+                pruned += 1
+            except (OSError, ValueError):
+                continue
+
+        if requeued or failed or pruned:
+            logger.info(f"Job spool: requeued {requeued}, failed {failed}, pruned {pruned} records")
+        return {'requeued': requeued, 'failed': failed, 'pruned': pruned}
+
+    def _maintenance_loop(self):
+        interval = min(self.stale_seconds / 3, 60)
+        while not self._stop.wait(interval):
+            try:
+                self._heartbeat()
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Job spool maintenance failed: {str(e)}")
+
+    def shutdown(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+
+def create_job_queue(handler):
+    """Create the job queue selected by JOB_BACKEND (spool or inprocess).
+
+    The spool queue is the default because every worker process on the host
+    shares it, so a job can be polled from whichever worker gets the request.
+    """
+    backend = os.environ.get('JOB_BACKEND', 'spool')
+    max_workers = int(os.environ.get('JOB_WORKERS', 2))
+    if backend == 'spool':
+        spool_dir = os.environ.get('JOB_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'hsbc_statement_jobs'))
+        logger.info(f"Using spool job queue in {spool_dir} with {max_workers} workers")
+        return SpoolJobQueue(
+            handler, spool_dir, max_workers=max_workers,
+            stale_seconds=int(os.environ.get('JOB_STALE_SECONDS', 300)),
+            record_ttl_seconds=int(os.environ.get('JOB_RECORD_TTL_SECONDS', 86400))
+        )
+    if backend != 'inprocess':
+        raise ValueError(f"Unknown JOB_BACKEND {backend!r}, expected spool or inprocess")
+    logger.info("Using in-process job queue; jobs are only visible to the worker that accepted them")
+    return InProcessJobQueue(handler, max_workers=max_workers)
@@ -0,0 +1,114 @@
+import gc
+import logging
+import os
+import threading
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# threshold: sample RSS every `sample_every` checkpoints and collect only above the limit
+# always:    collect at every checkpoint (the previous behaviour)
+# off:       never force a collection, only sample RSS for warnings
+GC_MODES = ('threshold', 'always', 'off')
+
+
+class MemoryGovernor:
+    """Decide when forced garbage collection is worth its cost.
+
+    Code that used to call gc.collect() after every batch calls checkpoint()
+    instead. Full collections cost O(heap), so by default they only happen
+    when a sampled RSS reading crosses the memory limit.
+    """
+
+    def __init__(self, max_memory_mb=100, sample_every=10, mode='threshold'):
+        if mode not in GC_MODES:
+            raise ValueError(f"Invalid GC mode: {mode}")
+        self.max_memory_mb = max_memory_mb
+        self.sample_every = max(1, sample_every)
+        self.mode = mode
+        self._process = psutil.Process(os.getpid())
+        self._lock = threading.Lock()
+        self.checkpoints = 0
+        self.samples = 0
+        self.collections = 0
+        self.last_rss_mb = None
+
+    def sample(self):
+        """Read the current RSS in MB"""
+        if self._process.pid != os.getpid():
+            # Forked worker (gunicorn, process pool): read our own process
+            self._process = psutil.Process(os.getpid())
+        rss_mb = self._process.memory_info().rss / (1024 * 1024)
+        with self._lock:
+            self.samples += 1
+            self.last_rss_mb = rss_mb
+        return rss_mb
+
+    def collect(self):
+        """Run a full collection and count it"""
+        gc.collect()
+        with self._lock:
+            self.collections += 1
+
+    def checkpoint(self, max_memory_mb=None):
+        """Mark a point where collecting would be safe (e.g. the end of a batch).
+
+        Returns True if a collection was triggered.
+        """
+        with self._lock:
+            self.checkpoints += 1
+            due = self.checkpoints % self.sample_every == 0
+
+        if self.mode == 'always':
+            self.collect()
+            return True
+        if not due:
+            return False
+
+        limit = max_memory_mb if max_memory_mb is not None else self.max_memory_mb
+        rss_mb = self.sample()
+        if rss_mb <= limit:
+            return False
+
+        logger.warning(f"Memory usage high: {rss_mb:.2f} MB (limit {limit} MB)")
+        if self.mode == 'threshold':
+            self.collect()
+            return True
+        return False
+
+    def get_stats(self):
+        """Return counters for comparing GC policies"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'max_memory_mb': self.max_memory_mb,
+                'sample_every': self.sample_every,
+                'checkpoints': self.checkpoints,
+                'samples': self.samples,
+                'collections': self.collections,
+                'last_rss_mb': round(self.last_rss_mb, 2) if self.last_rss_mb is not None else None,
+            }
+
+    def reset_stats(self):
+        """Reset all counters"""
+        with self._lock:
+            self.checkpoints = 0
+            self.samples = 0
+            self.collections = 0
+            self.last_rss_mb = None
+
+
+def _governor_from_env():
+    mode = os.environ.get('MEMORY_GC_MODE', 'threshold')
+    if mode not in GC_MODES:
+        logger.warning(f"Unknown MEMORY_GC_MODE {mode!r}, using 'threshold'")
+        mode = 'threshold'
+    return MemoryGovernor(
+        max_memory_mb=float(os.environ.get('MEMORY_MAX_MB', 100)),
+        sample_every=int(os.environ.get('MEMORY_SAMPLE_EVERY', 10)),
+        mode=mode
+    )
+
+
+# Process wide governor shared by the app, the PDF generator and the utilities
+memory_governor = _governor_from_env()
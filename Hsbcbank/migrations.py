@@ -0,0 +1,259 @@
+"""Schema migrations for existing databases.
+
+Base.metadata.create_all only creates missing tables, so changes to tables
+that already exist (such as new indexes) are applied here. Applied versions
+are recorded in the schema_migrations table.
+
+Run manually with:
+
+    python migrations.py
+
+The app also applies pending migrations on startup unless
+APPLY_MIGRATIONS_ON_STARTUP is false. On large tables, run them manually
+before deploying so that workers do not wait on index builds.
+"""
+import datetime
+import logging
+import os
+from collections import namedtuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+
+# Arbitrary key for the PostgreSQL advisory lock held while migrating
+MIGRATION_LOCK_KEY = 7250413
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200)),
+    Column('applied_at', DateTime),
+)
+
+
+def create_index(connection, name, table, columns, unique=False):
+    """Create an index if it does not exist.
+
+    On PostgreSQL the index is built CONCURRENTLY so that writes to the
+    table are not blocked. A failed concurrent build leaves an invalid
+    index behind, which is dropped and rebuilt.
+    """
+    column_list = ', '.join(columns)
+    create = 'CREATE UNIQUE INDEX' if unique else 'CREATE INDEX'
+    if connection.dialect.name == 'postgresql':
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {'name': name}).first()
+        if invalid:
+            logger.warning(f"Dropping invalid index {name} before rebuilding it")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        connection.execute(text(f"{create} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({column_list})"))
+    else:
+        connection.execute(text(f"{create} IF NOT EXISTS {name} ON {table} ({column_list})"))
+
+
+def drop_index(connection, name):
+    """Drop an index if it exists"""
+    concurrently = ' CONCURRENTLY' if connection.dialect.name == 'postgresql' else ''
+    connection.execute(text(f"DROP INDEX{concurrently} IF EXISTS {name}"))
+
+
+def _add_lookup_indexes(connection):
+    create_index(connection, 'ix_transactions_cardholder_id_date', 'transactions', ['cardholder_id', 'date'])
+    create_index(connection, 'ix_statements_cardholder_id_statement_date', 'statements',
+                 ['cardholder_id', 'statement_date'])
+    create_index(connection, 'ix_cardholders_card_number', 'cardholders', ['card_number'])
+
+
+def _unique_card_numbers(connection):
+    """Merge cardholders sharing a card number into the oldest row, then make card numbers unique.
+
+    Each step is idempotent, so an interrupted run (or a concurrent unique
+    index build that failed because of a new duplicate) can be repeated.
+    """
+    duplicate_ids = (
+        "SELECT c.id FROM cardholders c WHERE c.card_number IS NOT NULL "
+        "AND c.id > (SELECT MIN(d.id) FROM cardholders d WHERE d.card_number = c.card_number)"
+    )
+    keeper_id = (
+        "(SELECT MIN(d.id) FROM cardholders c JOIN cardholders d ON d.card_number = c.card_number "
+        "WHERE c.id = {table}.cardholder_id)"
+    )
+    for table in ('transactions', 'statements'):
+        result = connection.execute(text(
+            f"UPDATE {table} SET cardholder_id = {keeper_id.format(table=table)} "
+            f"WHERE cardholder_id IN ({duplicate_ids})"
+        ))
+        logger.info(f"Moved {result.rowcount} {table} rows to their surviving cardholder")
+    result = connection.execute(text(f"DELETE FROM cardholders WHERE id IN ({duplicate_ids})"))
+    logger.info(f"Removed {result.rowcount} duplicate cardholders")
+
+    create_index(connection, 'uq_cardholders_card_number', 'cardholders', ['card_number'], unique=True)
+    # The unique index also serves card number lookups
+    drop_index(connection, 'ix_cardholders_card_number')
+
+
+def _archive_support(connection):
+    """Index transactions by date for archival, and create the partitioned archive table on PostgreSQL.
+
+    SQLite archives use one plain table per month, created by the archival
+    job when a month is first archived.
+    """
+    create_index(connection, 'ix_transactions_date', 'transactions', ['date'])
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "CREATE TABLE IF NOT EXISTS transactions_archive ("
+            "id INTEGER NOT NULL, cardholder_id INTEGER, date DATE NOT NULL, "
+            "description VARCHAR(200), amount FLOAT, PRIMARY KEY (id, date)"
+            ") PARTITION BY RANGE (date)"
+        ))
+        # Partitioned indexes cannot be built concurrently; the table is new and empty
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_archive_cardholder_id_date "
+            "ON transactions_archive (cardholder_id, date)"
+        ))
+
+
+def _sqlite_transaction_ids_never_reused(connection):
+    """Rebuild the SQLite transactions table with AUTOINCREMENT so that ids are never handed out twice.
+
+    Without it SQLite reuses ids once the hot table has been archived down,
+    and archiving the new rows then collides with the archived ones. The
+    id sequence is started above every hot and archived id, and hot rows
+    whose id is already archived are given a new one (nothing references
+    transaction ids). PostgreSQL sequences never reuse ids.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    from models import Cardholder, Transaction
+
+    archived_max = 0
+    for name in inspect(connection).get_table_names():
+        if name.startswith('transactions_archive_'):
+            archived_max = max(archived_max, connection.execute(text(f"SELECT MAX(id) FROM {name}")).scalar() or 0)
+    hot_max = connection.execute(text("SELECT MAX(id) FROM transactions")).scalar() or 0
+    create_sql = connection.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transactions'"
+    )).scalar()
+    rebuild = 'AUTOINCREMENT' not in create_sql.upper()
+    target = 'transactions_rebuild' if rebuild else 'transactions'
+    columns = [column['name'] for column in inspect(connection).get_columns('transactions')
+               if column['name'] in Transaction.__table__.c and column['name'] != 'id']
+    column_list = ', '.join(columns)
+
+    # One transaction, so an interrupted run leaves the table as it was
+    connection.exec_driver_sql("BEGIN")
+    try:
+        if rebuild:
+            rebuild_metadata = MetaData()
+            # The copy's foreign key needs cardholders in its metadata
+            Cardholder.__table__.to_metadata(rebuild_metadata)
+            connection.execute(CreateTable(Transaction.__table__.to_metadata(rebuild_metadata, name=target)))
+            connection.execute(text(
+                f"INSERT INTO {target} (id, {column_list}) "
+                f"SELECT id, {column_list} FROM transactions WHERE id > :archived_max"
+            ), {'archived_max': archived_max})
+
+        sequence = max(archived_max, hot_max,
+                       connection.execute(text("SELECT MAX(seq) FROM sqlite_sequence WHERE name = :name"),
+                                          {'name': target}).scalar() or 0)
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {'name': target})
+        connection.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"),
+                           {'name': target, 'seq': sequence})
+
+        renumbered = connection.execute(text(
+            f"INSERT INTO {target} ({column_list}) "
+            f"SELECT {column_list} FROM transactions WHERE id <= :archived_max ORDER BY id"
+        ), {'archived_max': archived_max}).rowcount
+        if rebuild:
+            connection.execute(text("DROP TABLE transactions"))
+            connection.execute(text(f"ALTER TABLE {target} RENAME TO transactions"))
+            for index in Transaction.__table__.indexes:
+                index.create(connection)
+        else:
+            connection.execute(text("DELETE FROM transactions WHERE id <= :archived_max"),
+                               {'archived_max': archived_max})
+        connection.exec_driver_sql("COMMIT")
+    except Exception:
+        connection.exec_driver_sql("ROLLBACK")
+        raise
+    if renumbered:
+        logger.info(f"Gave {renumbered} transactions new ids that do not collide with archived ones")
+
+
+# Append new migrations with the next version number; never reorder or edit applied ones
+MIGRATIONS = [
+    Migration(1, 'add cardholder, transaction and statement lookup indexes', _add_lookup_indexes),
+    Migration(2, 'merge duplicate cardholders and make card numbers unique', _unique_card_numbers),
+    Migration(3, 'add transaction archive support', _archive_support),
+    Migration(4, 'stop SQLite reusing transaction ids', _sqlite_transaction_ids_never_reused),
+]
+
+
+def get_applied_versions(connection):
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def apply_migrations(engine, migrations=None):
+    """Apply pending migrations in version order, returning the versions applied.
+
+    Migrations run on an autocommit connection (CREATE INDEX CONCURRENTLY
+    cannot run inside a transaction), so each one must be safe to re-run if
+    it is interrupted before its version is recorded.
+    """
+    migrations = sorted(migrations or MIGRATIONS, key=lambda migration: migration.version)
+    applied_now = []
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        is_postgresql = connection.dialect.name == 'postgresql'
+        if is_postgresql:
+            # Serialise migrations across workers starting at the same time
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        try:
+            migration_metadata.create_all(connection)
+            applied = get_applied_versions(connection)
+
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                logger.info(f"Applying migration {migration.version}: {migration.name}")
+                migration.apply(connection)
+                # Another process may have recorded it while this one was applying it
+                if migration.version not in get_applied_versions(connection):
+                    connection.execute(schema_migrations.insert().values(
+                        version=migration.version,
+                        name=migration.name,
+                        applied_at=datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+                    ))
+                applied_now.append(migration.version)
+        finally:
+            if is_postgresql:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': MIGRATION_LOCK_KEY})
+
+    if applied_now:
+        logger.info(f"Applied migrations: {applied_now}")
+    return applied_now
+
+
+def migrate_on_startup(engine):
+    """Apply pending migrations unless APPLY_MIGRATIONS_ON_STARTUP is false"""
+    if os.environ.get('APPLY_MIGRATIONS_ON_STARTUP', 'true').lower() in ('0', 'false', 'no', 'off'):
+        logger.info("Skipping migrations on startup")
+        return []
+    return apply_migrations(engine)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from database import create_configured_engine
+    from models import Base
+
+    migration_engine = create_configured_engine()
+    Base.metadata.create_all(migration_engine)
+    apply_migrations(migration_engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, Text, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -6,6 +6,9 @@ Base = declarative_base()
 
 class Cardholder(Base):
     __tablename__ = 'cardholders'
+    __table_args__ = (
+        Index('uq_cardholders_card_number', 'card_number', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100))
@@ -19,6 +22,12 @@ class Cardholder(Base):
 
 class Transaction(Base):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        Index('ix_transactions_cardholder_id_date', 'cardholder_id', 'date'),
+        Index('ix_transactions_date', 'date'),
+        # Ids are never reused once rows are archived, so archive tables cannot collide
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True)
     cardholder_id = Column(Integer, ForeignKey('cardholders.id'))
@@ -30,6 +39,9 @@ class Transaction(Base):
 
 class Statement(Base):
     __tablename__ = 'statements'
+    __table_args__ = (
+        Index('ix_statements_cardholder_id_statement_date', 'cardholder_id', 'statement_date'),
+    )
     
     id = Column(Integer, primary_key=True)
     cardholder_id = Column(Integer, ForeignKey('cardholders.id'))
@@ -45,3 +57,11 @@ class Statement(Base):
     reward_points = Column(Integer)
     
     cardholder = relationship("Cardholder", back_populates="statements")
+
+class TransactionArchiveMonth(Base):
+    """A calendar month whose transactions have been moved out of the hot table (see archival.py)"""
+    __tablename__ = 'transaction_archive_months'
+    
+    month = Column(Date, primary_key=True)
+    table_name = Column(String(100), nullable=False)
+    archived_at = Column(DateTime)
@@ -0,0 +1,48 @@
+import itertools
+import logging
+from reportlab.platypus import PageBreak
+from reportlab.platypus.doctemplate import FrameActionFlowable
+
+logger = logging.getLogger(__name__)
+
+
+class LazyTransactionTable(FrameActionFlowable):
+    """Lay out transactions one page-sized batch at a time.
+
+    Rows are pulled lazily from any iterable (a list, a generator or a DB
+    cursor). Each time the document reaches this flowable it takes the next
+    batch, asks build_batch for that batch's flowables and queues them,
+    followed by a page break and itself when more rows remain. Only the
+    current and the prefetched batch are held in memory, so memory stays
+    flat regardless of the number of transactions.
+
+    build_batch(batch, batch_index, batch_count, has_more) must return a list
+    of flowables; batch_count is None when the total number of rows is unknown.
+    """
+
+    def __init__(self, rows, batch_size, build_batch, total=None):
+        # FrameActionFlowable.__init__ is abstract and must not be called
+        self._rows = iter(rows)
+        self.batch_size = batch_size
+        self.build_batch = build_batch
+        self.batch_count = None if total is None else (total + batch_size - 1) // batch_size
+        self.batch_index = 0
+        # Prefetch one batch so we always know whether another page follows
+        self._pending = self._take()
+
+    def _take(self):
+        return list(itertools.islice(self._rows, self.batch_size))
+
+    def frameAction(self, frame):
+        batch = self._pending
+        if not batch:
+            return
+
+        self._pending = self._take()
+        has_more = bool(self._pending)
+        content = list(self.build_batch(batch, self.batch_index, self.batch_count, has_more))
+        self.batch_index += 1
+
+        if has_more:
+            content.extend([PageBreak(), self])
+        frame.add_generated_content(*content)
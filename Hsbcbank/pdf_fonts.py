@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from weakref import WeakKeyDictionary
+import reportlab
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTEncoding, TTFNameBytes, TTFont, TTFontFace
+from utils import ensure_private_dir
+
+logger = logging.getLogger(__name__)
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+font_dir = os.path.join(base_dir, 'static', 'fonts')
+
+# Font files registered for each language, as (font name, file name) pairs
+LANGUAGE_FONT_FILES = {
+    'en': [('NotoSans', 'NotoSans-Regular.ttf'), ('NotoSansBold', 'NotoSans-Bold.ttf')],
+    'ta': [('NotoSansTamil', 'NotoSansTamil-Regular.ttf'), ('NotoSansTamilBold', 'NotoSansTamil-Bold.ttf')],
+    'hi': [('NotoSansDevanagari', 'NotoSansDevanagari-Regular.ttf'),
+           ('NotoSansDevangariBold', 'NotoSansDevanagari-Bold.ttf')],
+}
+
+# Directory for parsed font metrics shared by all workers; empty disables the cache.
+# It must belong to this user and not be writable by others (see _private_cache_dir)
+FONT_CACHE_DIR = os.environ.get(
+    'FONT_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), f"hsbc_font_cache_{os.getuid() if hasattr(os, 'getuid') else 'user'}")
+)
+
+_registered_languages = set()
+_register_lock = threading.Lock()
+
+
+def _cache_path(font_path):
+    """Cache file for a font, invalidated when the font file or ReportLab changes"""
+    stat = os.stat(font_path)
+    key = f"{os.path.abspath(font_path)}:{stat.st_size}:{stat.st_mtime_ns}:{reportlab.Version}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(FONT_CACHE_DIR, f"{os.path.basename(font_path)}.{digest}.json")
+
+
+def _private_cache_dir():
+    """Create the cache directory (mode 0700) and check nobody else can write to it.
+
+    Returns False, disabling the cache, when the directory belongs to another
+    user or is writable by group or others, since anyone who can write to it
+    controls the metrics of rendered statements.
+    """
+    try:
+        ensure_private_dir(FONT_CACHE_DIR)
+    except OSError as e:
+        logger.warning(f"Font cache disabled: {str(e)}")
+        return False
+    return True
+
+
+def _pdf_scale(units_per_em):
+    """Rebuild the glyph unit scaling function TTFontFile creates while parsing"""
+    if units_per_em == 1000:
+        return lambda x: x
+    _1000mult = 1000 / units_per_em
+    return lambda x: x * _1000mult
+
+
+def _encode(value):
+    """Font state as JSON data, tagging the types JSON cannot represent"""
+    if isinstance(value, TTFNameBytes):
+        return {'name': value.ustr}
+    if isinstance(value, bytes):
+        return {'bytes': value.decode('latin1')}
+    if isinstance(value, tuple):
+        return {'tuple': [_encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot cache font attribute of type {type(value).__name__}")
+
+
+def _decode(value):
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    (tag, data), = value.items()
+    if tag == 'name':
+        return TTFNameBytes(data.encode('utf8'))
+    if tag == 'bytes':
+        return data.encode('latin1')
+    if tag == 'tuple':
+        return tuple(_decode(item) for item in data)
+    if tag == 'dict':
+        return {_decode(key): _decode(item) for key, item in data}
+    raise ValueError(f"Unknown font cache tag {tag}")
+
+
+def _load_cached_font(name, font_path, cache_path):
+    # Plain data only: a cache file can at worst hold wrong metrics, never code
+    with open(cache_path, encoding='utf-8') as cache_file:
+        cached = json.load(cache_file)
+    font_state = _decode(cached['font'])
+    face_state = _decode(cached['face'])
+
+    face = TTFontFace.__new__(TTFontFace)
+    face.__dict__.update(face_state)
+    face._pdfScale = _pdf_scale(face.unitsPerEm)
+    # The raw font data is needed for subsetting; reading it is cheap compared to parsing
+    with open(font_path, 'rb') as font_file:
+        face._ttf_data = font_file.read()
+
+    font = TTFont.__new__(TTFont)
+    font.__dict__.update(font_state)
+    font.fontName = name
+    font.face = face
+    font.encoding = TTEncoding()
+    font.state = WeakKeyDictionary()
+    return font
+
+
+def _store_cached_font(font, cache_path):
+    cached = {
+        'font': _encode({k: v for k, v in font.__dict__.items() if k not in ('face', 'state', 'encoding')}),
+        'face': _encode({k: v for k, v in font.face.__dict__.items() if k not in ('_pdfScale', '_ttf_data')}),
+    }
+
+    # Write to a temporary file first so concurrent workers never read a partial cache
+    fd, temp_path = tempfile.mkstemp(dir=FONT_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+            json.dump(cached, temp_file, separators=(',', ':'))
+        os.replace(temp_path, cache_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def load_font(name, font_path):
+    """Load a TTFont, using the persistent metrics cache when available"""
+    if not FONT_CACHE_DIR or not _private_cache_dir():
+        return TTFont(name, font_path)
+
+    cache_path = _cache_path(font_path)
+    if os.path.exists(cache_path):
+        try:
+            return _load_cached_font(name, font_path, cache_path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable font cache {cache_path}: {str(e)}")
+
+    font = TTFont(name, font_path)
+    try:
+        _store_cached_font(font, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not write font cache {cache_path}: {str(e)}")
+    return font
+
+
+def ensure_language_fonts(language):
+    """Register the regular and bold fonts for a language on first use"""
+    if language not in LANGUAGE_FONT_FILES:
+        language = 'en'
+    if language in _registered_languages:
+        return
+
+    with _register_lock:
+        if language in _registered_languages:
+            return
+        try:
+            (normal_name, normal_file), (bold_name, bold_file) = LANGUAGE_FONT_FILES[language]
+            pdfmetrics.registerFont(load_font(normal_name, os.path.join(font_dir, normal_file)))
+            pdfmetrics.registerFont(load_font(bold_name, os.path.join(font_dir, bold_file)))
+
+            # Create the font family grouping for better text rendering
+            pdfmetrics.registerFontFamily(normal_name, normal=normal_name, bold=bold_name)
+
+            _registered_languages.add(language)
+            logger.info(f"Registered fonts for language: {language}")
+        except Exception as e:
+            logger.warning(f"Could not register custom fonts for {language}: {str(e)}")
+            logger.warning("Falling back to built-in fonts")
+
+
+def register_fonts():
+    """Register the fonts for every supported language (e.g. in pool worker initializers)"""
+    for language in LANGUAGE_FONT_FILES:
+        ensure_language_fonts(language)
@@ -0,0 +1,184 @@
+import logging
+import threading
+from collections import namedtuple
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+
+logger = logging.getLogger(__name__)
+
+HSBC_RED = colors.Color(red=0.8, green=0.1, blue=0.1)
+
+# Regular and bold font names registered for each supported language
+FONT_NAMES = {
+    'en': ('NotoSans', 'NotoSansBold'),
+    'ta': ('NotoSansTamil', 'NotoSansTamilBold'),
+    'hi': ('NotoSansDevanagari', 'NotoSansDevangariBold'),
+}
+
+# Extra paragraph attributes needed for complex scripts
+SCRIPT_ATTRIBUTES = {
+    'ta': {
+        'encoding': 'utf-8',
+        'wordWrap': 'CJK',
+        'allowWidows': 0,
+        'allowOrphans': 0,
+        'language': 'Tamil',
+    },
+    'hi': {
+        'encoding': 'utf-8',
+        'wordWrap': 'CJK',
+        'language': 'Hindi',
+    },
+}
+
+StyleBundle = namedtuple('StyleBundle', [
+    'language',
+    'font_name',
+    'bold_font_name',
+    'title',
+    'table_header',
+    'table_label',
+    'table_value',
+    'transaction_header',
+    'transaction_cell',
+    'page_info',
+    'footer',
+    'cardholder_table',
+    'summary_table',
+    'transaction_table',
+])
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+def get_font_names(language):
+    """Return the (regular, bold) font names for a language"""
+    return FONT_NAMES.get(language, FONT_NAMES['en'])
+
+
+def _paragraph_style(language, name, **kwargs):
+    """Create a ParagraphStyle with the script attributes for the language applied"""
+    kwargs.update(SCRIPT_ATTRIBUTES.get(language, {}))
+    return ParagraphStyle(name, **kwargs)
+
+
+def _build_bundle(language):
+    """Build every style used by the statement for one language"""
+    font_name, bold_font_name = get_font_names(language)
+    sample_styles = getSampleStyleSheet()
+
+    title = _paragraph_style(
+        language,
+        'CustomTitle',
+        parent=sample_styles['Heading1'],
+        fontName=bold_font_name,
+        fontSize=16,
+        spaceAfter=30,
+        textColor=HSBC_RED,
+        alignment=1  # Center alignment
+    )
+
+    # Table cell styles, used where cells are rendered as paragraphs (Tamil)
+    table_header = _paragraph_style(language, 'TableHeader', fontName=bold_font_name, fontSize=14, alignment=0)
+    table_label = _paragraph_style(language, 'TableLabel', fontName=bold_font_name, fontSize=10, alignment=0)
+    table_value = _paragraph_style(language, 'TableValue', fontName=font_name, fontSize=10, alignment=0)
+    transaction_header = _paragraph_style(
+        language, 'TransactionHeader', fontName=bold_font_name, fontSize=12, alignment=0
+    )
+    transaction_cell = _paragraph_style(language, 'TransactionCell', fontName=font_name, fontSize=10, alignment=0)
+
+    page_info = _paragraph_style(
+        language,
+        'PageInfo',
+        parent=sample_styles['Normal'],
+        fontName=font_name,
+        fontSize=8,
+        alignment=1,  # Center alignment
+        spaceAfter=10
+    )
+    footer = _paragraph_style(
+        language,
+        'Footer',
+        parent=sample_styles['Normal'],
+        fontName=font_name,
+        fontSize=8,
+        alignment=1,  # Center alignment
+    )
+
+    cardholder_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), HSBC_RED),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), bold_font_name),
+        ('FONTNAME', (0, 1), (0, -1), bold_font_name),
+        ('FONTNAME', (1, 1), (1, -1), font_name),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('FONTSIZE', (0, 1), (-1, -1), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('TOPPADDING', (0, 1), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+        ('LEFTPADDING', (0, 0), (-1, -1), 10),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE')
+    ])
+    summary_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), HSBC_RED),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), bold_font_name),
+        ('FONTNAME', (0, 1), (0, -1), bold_font_name),
+        ('FONTNAME', (1, 1), (1, -1), font_name),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    transaction_table = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), HSBC_RED),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), bold_font_name),
+        ('FONTNAME', (0, 1), (-1, -1), font_name),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    return StyleBundle(
+        language=language,
+        font_name=font_name,
+        bold_font_name=bold_font_name,
+        title=title,
+        table_header=table_header,
+        table_label=table_label,
+        table_value=table_value,
+        transaction_header=transaction_header,
+        transaction_cell=transaction_cell,
+        page_info=page_info,
+        footer=footer,
+        cardholder_table=cardholder_table,
+        summary_table=summary_table,
+        transaction_table=transaction_table,
+    )
+
+
+def get_style_bundle(language):
+    """Return the shared style bundle for a language, building it on first use.
+
+    Bundles are shared across generators and threads, so callers must treat
+    the styles as read-only.
+    """
+    if language not in FONT_NAMES:
+        language = 'en'
+
+    bundle = _bundles.get(language)
+    if bundle is None:
+        with _bundles_lock:
+            bundle = _bundles.get(language)
+            if bundle is None:
+                logger.debug(f"Building PDF style bundle for language: {language}")
+                bundle = _build_bundle(language)
+                _bundles[language] = bundle
+    return bundle
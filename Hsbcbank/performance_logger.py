@@ -1,52 +1,96 @@
+import functools
+import inspect
 import time
 import logging
-import gc
 import psutil
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from threading import current_thread
+from memory_governor import memory_governor
 
 logger = logging.getLogger(__name__)
 
+# Timers and metrics of the request being handled, see PerformanceLogger.request_scope
+_request_state = ContextVar('performance_request_state', default=None)
+
 class PerformanceLogger:
+    """Operation timings and memory deltas.
+
+    Inside request_scope() (or a function decorated with track_request) the
+    timers and metrics belong to that request alone. Its context is carried
+    into asyncio.to_thread calls, so coroutines sharing the event loop's
+    thread do not overwrite each other's figures. Outside a scope, timers
+    are keyed by thread.
+    """
     def __init__(self):
         self.timers = {}
         self.metrics = {}
         self.start_memory = {}
     
+    @contextmanager
+    def request_scope(self):
+        """Give the current request its own timers and metrics"""
+        token = _request_state.set({'timers': {}, 'start_memory': {}, 'metrics': {}})
+        try:
+            yield
+        finally:
+            _request_state.reset(token)
+    
+    def track_request(self, handler):
+        """Decorate a sync or async request handler so that it runs in its own request scope"""
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                with self.request_scope():
+                    return await handler(*args, **kwargs)
+            return async_wrapper
+    
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            with self.request_scope():
+                return handler(*args, **kwargs)
+        return wrapper
+    
+    def _state(self, operation_name):
+        """Timer key and the timers, start memory and metrics dicts for an operation"""
+        state = _request_state.get()
+        if state is not None:
+            return operation_name, state['timers'], state['start_memory'], state['metrics']
+        return f"{operation_name}_{current_thread().ident}", self.timers, self.start_memory, self.metrics
+    
     def start(self, operation_name):
         """Start timing an operation"""
-        thread_id = current_thread().ident
-        key = f"{operation_name}_{thread_id}"
+        key, timers, start_memory, _ = self._state(operation_name)
         
-        self.timers[key] = time.time()
+        timers[key] = time.perf_counter()
         
         # Record memory usage at the start
         process = psutil.Process(os.getpid())
-        self.start_memory[key] = process.memory_info().rss / (1024 * 1024)  # MB
+        start_memory[key] = process.memory_info().rss / (1024 * 1024)  # MB
         
         logger.debug(f"Started operation: {operation_name}")
     
     def end(self, operation_name):
         """End timing an operation and record metrics"""
-        thread_id = current_thread().ident
-        key = f"{operation_name}_{thread_id}"
+        key, timers, start_memory, metrics = self._state(operation_name)
         
-        if key not in self.timers:
+        if key not in timers:
             logger.warning(f"Operation {operation_name} was never started")
             return
         
-        end_time = time.time()
-        duration = end_time - self.timers.pop(key)
+        end_time = time.perf_counter()
+        duration = end_time - timers.pop(key)
         
         # Get memory usage at the end
         process = psutil.Process(os.getpid())
         end_memory = process.memory_info().rss / (1024 * 1024)  # MB
         
         # Calculate memory change
-        memory_change = end_memory - self.start_memory.pop(key, 0)
+        memory_change = end_memory - start_memory.pop(key, 0)
         
         # Store metrics
-        self.metrics[operation_name] = {
+        metrics[operation_name] = {
             'duration_ms': round(duration * 1000, 2),
             'memory_change_mb': round(memory_change, 2),
             'end_memory_mb': round(end_memory, 2)
@@ -54,15 +98,17 @@ class PerformanceLogger:
         
         logger.debug(f"Completed operation: {operation_name} in {duration:.2f} seconds")
         
-        # Force garbage collection after operation
-        gc.collect()
+        # Let the memory governor decide whether a collection is needed
+        memory_governor.checkpoint()
     
     def get_metrics(self):
-        """Get all recorded metrics"""
-        return self.metrics
+        """Get the metrics recorded by the current request, or all metrics outside a request scope"""
+        state = _request_state.get()
+        return dict(state['metrics']) if state is not None else self.metrics
     
     def reset(self):
         """Reset all metrics"""
         self.timers = {}
         self.metrics = {}
         self.start_memory = {}
+
@@ -0,0 +1,307 @@
+import csv
+import datetime
+import io
+import logging
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Cardholder, Statement, Transaction
+from archival import period_transactions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSACTION_DATE = '2025-03-02'
+
+CARDHOLDER_FIELDS = ('name', 'card_number', 'billing_address', 'email', 'phone')
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+# Sample transactions used when a request does not provide any
+DEFAULT_TRANSACTIONS = [
+    {'date': '2025-03-02', 'description': "Amazon India - Electronics", 'amount': 3499.00},
+    {'date': '2025-03-02', 'description': "Uber Ride - New Delhi", 'amount': 285.50},
+    {'date': '2025-03-03', 'description': "Big Bazaar - Grocery", 'amount': 1230.75},
+    {'date': '2025-03-05', 'description': "Mobile Recharge", 'amount': 499.00},
+]
+
+
+class DateParser:
+    """Parse YYYY-MM-DD strings, memoising repeated values.
+
+    Statements repeat the same handful of dates many times, so each distinct
+    string is parsed once. Invalid dates fall back to today, as before.
+    """
+
+    def __init__(self):
+        self._parsed = {}
+
+    def __call__(self, value):
+        parsed = self._parsed.get(value)
+        if parsed is None:
+            try:
+                parsed = datetime.date.fromisoformat(value)
+            except (TypeError, ValueError):
+                try:
+                    parsed = datetime.datetime.strptime(value, '%Y-%m-%d').date()
+                except (TypeError, ValueError):
+                    # Fallback to current date if format is invalid
+                    parsed = datetime.date.today()
+            self._parsed[value] = parsed
+        return parsed
+
+
+def build_transaction_rows(cardholder_id, transaction_data, parse_date=None):
+    """Turn request transaction dicts into insert parameter rows"""
+    parse_date = parse_date or DateParser()
+    return [
+        {
+            'cardholder_id': cardholder_id,
+            'date': parse_date(tx_data.get('date', DEFAULT_TRANSACTION_DATE)),
+            'description': tx_data.get('description', 'Transaction'),
+            'amount': float(tx_data.get('amount', 0))
+        }
+        for tx_data in transaction_data
+    ]
+
+
+def _copy_rows(db_session, rows):
+    """Load rows with COPY ... FROM STDIN on psycopg2 connections"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row['cardholder_id'], row['date'].isoformat(), row['description'], row['amount']])
+    buffer.seek(0)
+
+    dbapi_connection = db_session.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            "COPY transactions (cardholder_id, date, description, amount) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+
+def bulk_insert_transactions(db_session, cardholder_id, transaction_data, return_ids=False):
+    """Insert transactions in a single round trip without creating ORM objects.
+
+    Uses COPY on PostgreSQL (psycopg2) and an executemany Core insert
+    elsewhere. Nothing is committed, so the caller controls the transaction.
+    Returns lightweight records with date, description and amount (and id
+    when return_ids is set) that can be passed to StatementPDFGenerator.
+    """
+    rows = build_transaction_rows(cardholder_id, transaction_data)
+    if not rows:
+        return []
+    insert_transaction_rows(db_session, rows, return_ids)
+    return [SimpleNamespace(**row) for row in rows]
+
+
+def insert_transaction_rows(db_session, rows, return_ids=False):
+    """Insert parameter rows from build_transaction_rows (or rows already in that shape).
+
+    When return_ids is set each row gets its new id under 'id'. Nothing is
+    committed.
+    """
+    connection = db_session.connection()
+    if return_ids:
+        # RETURNING with executemany keeps ids in parameter order
+        result = db_session.execute(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            rows
+        )
+        for row, transaction_id in zip(rows, result.scalars()):
+            row['id'] = transaction_id
+    elif connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        _copy_rows(db_session, rows)
+    else:
+        db_session.execute(insert(Transaction), rows)
+
+
+class CardholderCache:
+    """Per-process LRU of card number -> cardholder id for hot cardholders.
+
+    An entry also remembers the details last written, so a hit only skips
+    the database when the request carries the same details. Entries should
+    be added after the transaction that wrote the row has committed.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, values):
+        """Return the cached id for a cardholder with exactly these details, or None"""
+        key = values.get('card_number')
+        details = tuple(values.get(field) for field in CARDHOLDER_FIELDS)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == details:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, cardholder):
+        """Remember a committed cardholder record"""
+        if not cardholder.card_number:
+            return
+        details = tuple(getattr(cardholder, field) for field in CARDHOLDER_FIELDS)
+        with self._lock:
+            self._entries[cardholder.card_number] = (cardholder.id, details)
+            self._entries.move_to_end(cardholder.card_number)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def upsert_cardholder(db_session, cardholder_data, cache=None):
+    """Insert or update the cardholder with this card number and return its record.
+
+    Repeated statements for a card reuse one row, so its transactions and
+    statements accumulate under a single id. Uses ON CONFLICT on the unique
+    card number index on PostgreSQL and SQLite, and select-then-write
+    elsewhere. Nothing is committed.
+    """
+    values = {field: cardholder_data.get(field) for field in CARDHOLDER_FIELDS}
+    card_number = values['card_number']
+
+    if cache is not None and card_number:
+        cardholder_id = cache.get(values)
+        if cardholder_id is not None:
+            return SimpleNamespace(id=cardholder_id, **values)
+
+    dialect_name = db_session.connection().dialect.name
+    if card_number and dialect_name in UPSERT_INSERTS:
+        statement = UPSERT_INSERTS[dialect_name](Cardholder).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Cardholder.card_number],
+            set_={field: statement.excluded[field] for field in CARDHOLDER_FIELDS if field != 'card_number'}
+        ).returning(Cardholder.id)
+        cardholder_id = db_session.execute(statement).scalar_one()
+    else:
+        cardholder_id = None
+        if card_number:
+            cardholder_id = db_session.execute(
+                select(Cardholder.id).where(Cardholder.card_number == card_number).limit(1)
+            ).scalar()
+        if cardholder_id is None:
+            cardholder_id = db_session.execute(insert(Cardholder).values(**values)).inserted_primary_key[0]
+        else:
+            db_session.execute(update(Cardholder).where(Cardholder.id == cardholder_id).values(**values))
+
+    return SimpleNamespace(id=cardholder_id, **values)
+
+
+def aggregate_transactions(db_session, cardholder_ids, period_start, period_end):
+    """Total purchases and payments per cardholder for a period in one grouped query.
+
+    Positive amounts are purchases and negative amounts are payments.
+    Archived months are included when the period reaches them. Returns
+    {cardholder_id: {'purchases_charges', 'payments_received',
+    'transaction_count'}} for cardholders with transactions in the period.
+    """
+    source = period_transactions(db_session, cardholder_ids, period_start, period_end)
+    purchases = func.coalesce(func.sum(case((source.c.amount > 0, source.c.amount), else_=0.0)), 0.0)
+    payments = func.coalesce(func.sum(case((source.c.amount < 0, -source.c.amount), else_=0.0)), 0.0)
+    rows = db_session.execute(
+        select(source.c.cardholder_id, purchases, payments, func.count(source.c.id))
+        .group_by(source.c.cardholder_id)
+    )
+    return {
+        cardholder_id: {
+            'purchases_charges': round(purchases_total, 2),
+            'payments_received': round(payments_total, 2),
+            'transaction_count': count
+        }
+        for cardholder_id, purchases_total, payments_total, count in rows
+    }
+
+
+def get_previous_statement(db_session, cardholder_id, before):
+    """Return new_balance, credit_limit and reward_points of the latest statement dated before a day, or None"""
+    return db_session.execute(
+        select(Statement.new_balance, Statement.credit_limit, Statement.reward_points)
+        .where(Statement.cardholder_id == cardholder_id, Statement.statement_date < before)
+        .order_by(Statement.statement_date.desc(), Statement.id.desc())
+        .limit(1)
+    ).first()
+
+
+def compute_statement_summary(db_session, cardholder_id, period_start, period_end,
+                              credit_limit=None, finance_charges=0.0, default_credit_limit=0.0, totals=None):
+    """Derive statement figures from the cardholder's stored transactions.
+
+    The previous balance is the new balance of the latest statement before
+    the period. The credit limit falls back to that statement's limit and
+    then to default_credit_limit, and reward points are carried over from
+    that statement. Pass totals when aggregate_transactions
+    has already been run for the cardholder. Returns the Statement column
+    values.
+    """
+    if totals is None:
+        totals = aggregate_transactions(db_session, [cardholder_id], period_start, period_end).get(cardholder_id)
+    purchases_charges = totals['purchases_charges'] if totals else 0.0
+    payments_received = totals['payments_received'] if totals else 0.0
+
+    previous = get_previous_statement(db_session, cardholder_id, period_start)
+    previous_balance = previous.new_balance if previous and previous.new_balance is not None else 0.0
+    if credit_limit is None:
+        credit_limit = previous.credit_limit if previous and previous.credit_limit is not None else default_credit_limit
+
+    new_balance = round(previous_balance + purchases_charges + finance_charges - payments_received, 2)
+    return {
+        'previous_balance': previous_balance,
+        'payments_received': payments_received,
+        'purchases_charges': purchases_charges,
+        'finance_charges': finance_charges,
+        'new_balance': new_balance,
+        'credit_limit': credit_limit,
+        'available_credit': round(credit_limit - new_balance, 2),
+        'reward_points': previous.reward_points if previous and previous.reward_points is not None else 0
+    }
+
+
+def _period_transactions_query(db_session, cardholder_id, period_start, period_end):
+    source = period_transactions(db_session, [cardholder_id], period_start, period_end)
+    return (
+        select(source.c.date, source.c.description, source.c.amount)
+        .order_by(source.c.date, source.c.id)
+    )
+
+
+def get_period_transactions(db_session, cardholder_id, period_start, period_end):
+    """Fetch date, description and amount of a cardholder's transactions for a period"""
+    return db_session.execute(_period_transactions_query(db_session, cardholder_id, period_start, period_end)).all()
+
+
+def iter_period_transactions(db_session, cardholder_id, period_start, period_end, batch_size=1000):
+    """Yield a cardholder's transactions for a period without loading them all.
+
+    Rows are fetched batch_size at a time, using a server-side cursor where
+    the driver supports one. The session must stay open until the iterator
+    is exhausted.
+    """
+    result = db_session.execute(
+        _period_transactions_query(db_session, cardholder_id, period_start, period_end)
+        .execution_options(yield_per=batch_size)
+    )
+    try:
+        yield from result
+    finally:
+        result.close()
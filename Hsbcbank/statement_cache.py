@@ -0,0 +1,145 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(render_input):
+    """Content hash of everything that determines the rendered document"""
+    canonical = json.dumps(render_input, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class StatementPDFCache:
+    """LRU cache of rendered statement PDFs keyed by content hash.
+
+    The memory tier is bounded by both entry count and total bytes. When
+    disk_dir is set, entries are also written there (bounded by
+    max_disk_bytes, least recently used first) so that they survive restarts
+    and can be shared by workers on the same host.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, disk_dir=None, max_disk_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pdf")
+
+    def get(self, key):
+        """Return the cached PDF bytes for key, or None"""
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pdf_bytes
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as cached_file:
+                    pdf_bytes = cached_file.read()
+                # Refresh the modification time used for disk LRU eviction
+                os.utime(path)
+            except OSError:
+                pdf_bytes = None
+            if pdf_bytes is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._put_memory(key, pdf_bytes)
+                return pdf_bytes
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, pdf_bytes):
+        """Store rendered PDF bytes under key"""
+        self._put_memory(key, pdf_bytes)
+        if self.disk_dir:
+            try:
+                self._put_disk(key, pdf_bytes)
+            except OSError as e:
+                logger.warning(f"Could not write PDF cache entry {key}: {str(e)}")
+
+    def _put_memory(self, key, pdf_bytes):
+        size = len(pdf_bytes)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._current_bytes -= len(previous)
+            self._entries[key] = pdf_bytes
+            self._current_bytes += size
+
+            while len(self._entries) > self.max_entries or self._current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def _put_disk(self, key, pdf_bytes):
+        fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(pdf_bytes)
+        os.replace(temp_path, self._disk_path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+
+    def get_stats(self):
+        """Return hit/miss counters and current usage"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
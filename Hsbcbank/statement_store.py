@@ -0,0 +1,232 @@
+"""Managed directory of generated statement PDFs.
+
+Every generated PDF is written to one directory as <unique_id>.pdf and
+removed again by the store: files expire ttl_seconds after they were
+written, and when the directory grows past max_bytes the least recently
+used files are evicted first. A file's modification time is when it was
+written and its access time, set explicitly on every download, is when it
+was last used.
+
+The directory is the source of truth, so worker processes on one host can
+share it. Each process only keeps an estimate of the bytes used, which
+every sweep corrects.
+
+A PDF can be stored under a content key (the statement cache key), so a
+repeated statement reuses the file already stored for it instead of
+writing another copy. Each process remembers the keys of the files it
+stored.
+"""
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from utils import ensure_private_dir
+
+logger = logging.getLogger(__name__)
+
+# Unique ids are uuid4 strings; anything else never reaches the filesystem
+UNIQUE_ID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+
+# Suffix of files that are still being written
+PARTIAL_SUFFIX = '.part'
+
+
+class StatementStore:
+    """Generated statement PDFs with TTL expiry and a total size quota"""
+
+    def __init__(self, directory, ttl_seconds=3600, max_bytes=512 * 1024 * 1024, max_keys=10000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # Content key -> unique id of the file stored for it, least recently used first
+        self._keys = OrderedDict()
+        self.reused = 0
+        self._bytes = 0
+        self._files = 0
+        self.expired = 0
+        self.evictions = 0
+        self.sweeps = 0
+        self._stop = threading.Event()
+        self._sweeper = None
+
+        ensure_private_dir(self.directory)
+        # Account for files left by earlier runs and other workers
+        self.sweep()
+
+    def _path(self, unique_id):
+        return os.path.join(self.directory, f"{unique_id}.pdf")
+
+    def new_file(self):
+        """Return (unique_id, partial_path) for a PDF written in place; commit(unique_id) publishes it.
+
+        The partial file is created here, empty and with mode 0600, so
+        writing it in place keeps it private.
+        """
+        unique_id = str(uuid.uuid4())
+        partial_path = self._path(unique_id) + PARTIAL_SUFFIX
+        os.close(os.open(partial_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+        return unique_id, partial_path
+
+    def commit(self, unique_id):
+        """Publish a PDF written to the path returned by new_file, returning its final path"""
+        path = self._path(unique_id)
+        os.replace(path + PARTIAL_SUFFIX, path)
+        self._added(os.path.getsize(path))
+        return path
+
+    def put(self, pdf_bytes, content_key=None):
+        """Store PDF bytes, returning (unique_id, path); find(content_key) returns the file later"""
+        unique_id, partial_path = self.new_file()
+        with open(partial_path, 'wb') as partial_file:
+            partial_file.write(pdf_bytes)
+        path = self.commit(unique_id)
+        if content_key is not None:
+            with self._lock:
+                self._keys[content_key] = unique_id
+                self._keys.move_to_end(content_key)
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+        return unique_id, path
+
+    def find(self, content_key):
+        """Return (unique_id, path) of the file stored under content_key, or None if it is gone.
+
+        The file is renewed: it expires ttl_seconds from now, like a newly
+        stored one, so download links issued for it stay valid as long.
+        """
+        with self._lock:
+            unique_id = self._keys.get(content_key)
+        if unique_id is None:
+            return None
+        path = self._path(unique_id)
+        now = time.time()
+        try:
+            if now - os.stat(path).st_mtime > self.ttl_seconds:
+                raise FileNotFoundError(path)
+            os.utime(path, (now, now))
+        except OSError:
+            with self._lock:
+                if self._keys.get(content_key) == unique_id:
+                    del self._keys[content_key]
+            return None
+        with self._lock:
+            self._keys.move_to_end(content_key)
+            self.reused += 1
+        return unique_id, path
+
+    def _added(self, size):
+        with self._lock:
+            self._bytes += size
+            self._files += 1
+            over_quota = self._bytes > self.max_bytes
+        if over_quota:
+            self.sweep()
+
+    def get_path(self, unique_id):
+        """Path of an unexpired stored PDF, or None; marks the file as recently used"""
+        if not unique_id or not UNIQUE_ID_PATTERN.match(unique_id):
+            return None
+        path = self._path(unique_id)
+        now = time.time()
+        try:
+            stat = os.stat(path)
+            if now - stat.st_mtime > self.ttl_seconds:
+                return None
+            os.utime(path, (now, stat.st_mtime))
+        except OSError:
+            return None
+        return path
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            # Already removed by another worker
+            return False
+        except OSError as e:
+            logger.warning(f"Could not remove generated statement {path}: {str(e)}")
+            return False
+
+    def sweep(self, now=None):
+        """Delete expired files, then evict least recently used ones until under max_bytes.
+
+        Returns the number of files expired and evicted.
+        """
+        now = now or time.time()
+        expired = 0
+        evicted = 0
+        stored = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(('.pdf', PARTIAL_SUFFIX)):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                expired += self._unlink(entry.path)
+            elif entry.name.endswith('.pdf'):
+                stored.append((stat.st_atime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        stored.sort()
+        files = len(stored)
+        for _, size, path in stored:
+            if total <= self.max_bytes:
+                break
+            if self._unlink(path):
+                evicted += 1
+            total -= size
+            files -= 1
+
+        with self._lock:
+            self._bytes = total
+            self._files = files
+            self.expired += expired
+            self.evictions += evicted
+            self.sweeps += 1
+        if expired or evicted:
+            logger.info(f"Statement store: expired {expired}, evicted {evicted}, {files} files using {total} bytes")
+        return {'expired': expired, 'evicted': evicted}
+
+    def start_sweeper(self, interval_seconds=60):
+        """Sweep every interval_seconds on a background thread"""
+        self._sweeper = threading.Thread(
+            target=self._sweep_loop, args=(interval_seconds,), name='statement-store-sweeper', daemon=True
+        )
+        self._sweeper.start()
+        return self
+
+    def _sweep_loop(self, interval_seconds):
+        while not self._stop.wait(interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Statement store sweep failed: {str(e)}")
+
+    def shutdown(self):
+        """Stop the background sweeper"""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+
+    def get_stats(self):
+        """Return current usage and expiry/eviction counters"""
+        with self._lock:
+            return {
+                'files': self._files,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'sweeps': self.sweeps,
+                'reused': self.reused,
+            }
@@ -239,6 +239,9 @@ function updateTranslations(language) {
     }
 }
 
+// Last preview per language, revalidated with its ETag
+const previewCache = {};
+
 // Function to preview statement
 function previewStatement(language) {
     const formData = collectFormData(language);
@@ -250,14 +253,32 @@ function previewStatement(language) {
     previewBtn.disabled = true;
     
     // Send AJAX request to preview statement
+    const headers = {
+        'Content-Type': 'application/json'
+    };
+    const cached = previewCache[language];
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
     fetch('/preview-statement', {
         method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
+        headers: headers,
         body: JSON.stringify(formData)
     })
-    .then(response => response.text())
+    .then(response => {
+        // 304: the form has not changed since the last preview
+        if (response.status === 304 && cached) {
+            return cached.html;
+        }
+        return response.text().then(html => {
+            const etag = response.headers.get('ETag');
+            if (response.ok && etag) {
+                previewCache[language] = { etag: etag, html: html };
+            }
+            return html;
+        });
+    })
     .then(html => {
         // Show the preview in modal
         const previewContent = document.getElementById('previewContent');
@@ -0,0 +1,230 @@
+"""Benchmark the PDF pipeline across languages and transaction counts.
+
+Examples (run from the project root):
+
+    python test_cases/run_benchmarks.py
+    python test_cases/run_benchmarks.py --save-baseline benchmark_results/baseline.json
+    python test_cases/run_benchmarks.py --baseline benchmark_results/baseline.json
+
+Results go to benchmark_results/ (ignored by git) unless --output says
+otherwise. Timings depend on the machine, so no baseline is committed:
+save one on the machine that runs the comparison and pass it explicitly.
+With --baseline the run exits with status 1 when any case regresses past
+the configured thresholds.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reportlab
+import pdf_generator
+from pdf_generator import StatementPDFGenerator
+from memory_governor import memory_governor
+
+# Default location of results; ignored by git
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmark_results')
+
+DEFAULT_LANGUAGES = ['en', 'ta', 'hi']
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+
+# Allowed relative increase over the baseline before a case counts as a regression
+DEFAULT_THRESHOLDS = {
+    'wall_time_ms': 0.15,
+    'peak_memory_mb': 0.20,
+    'output_bytes': 0.05,
+}
+
+
+def make_statement_data(size):
+    """Build deterministic statement, cardholder and transactions for a case"""
+    cardholder = SimpleNamespace(
+        name="Benchmark User",
+        card_number="1234567890123456",
+        billing_address="D-45, Green Park,\nNew Delhi-110016, India",
+        email="benchmark@example.com",
+        phone="9876543210"
+    )
+    statement = SimpleNamespace(
+        statement_date=datetime.date(2025, 3, 31),
+        previous_balance=13840.00,
+        payments_received=175.50,
+        purchases_charges=640.00,
+        finance_charges=45.00,
+        new_balance=13935.50,
+        credit_limit=175000.00,
+        available_credit=161064.50,
+        payment_due_date=datetime.date(2025, 4, 21),
+        reward_points=175
+    )
+    start = datetime.date(2025, 3, 1)
+    transactions = [
+        SimpleNamespace(
+            date=start + datetime.timedelta(days=i % 30),
+            description=f"Merchant {i % 97} - Purchase {i}",
+            amount=round(100 + (i * 37) % 5000 + (i % 100) / 100, 2)
+        )
+        for i in range(size)
+    ]
+    return statement, cardholder, transactions
+
+
+def render_once(language, size, trace_memory=False):
+    """Render one statement, returning wall time, stage timings, output size and peak memory"""
+    statement, cardholder, transactions = make_statement_data(size)
+    pdf_generator.perf_logger.reset()
+
+    if trace_memory:
+        tracemalloc.start()
+    start_time = time.perf_counter()
+    pdf_bytes = StatementPDFGenerator(statement, cardholder, transactions, language).render_bytes()
+    wall_time_ms = (time.perf_counter() - start_time) * 1000
+    peak_memory_mb = None
+    if trace_memory:
+        peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    stages = {
+        stage: metrics['duration_ms']
+        for stage, metrics in pdf_generator.perf_logger.get_metrics().items()
+    }
+    return wall_time_ms, stages, len(pdf_bytes), peak_memory_mb
+
+
+def run_case(language, size, repeat):
+    """Benchmark one language/size combination"""
+    # Warm up fonts and styles so that one-off process costs are not measured
+    render_once(language, min(size, 10))
+
+    wall_times = []
+    stage_runs = []
+    output_bytes = 0
+    for _ in range(repeat):
+        wall_time_ms, stages, output_bytes, _ = render_once(language, size)
+        wall_times.append(wall_time_ms)
+        stage_runs.append(stages)
+
+    # Peak memory is measured in a separate run because tracing slows rendering down
+    _, _, _, peak_memory_mb = render_once(language, size, trace_memory=True)
+
+    stage_names = sorted({name for stages in stage_runs for name in stages})
+    return {
+        'language': language,
+        'transactions': size,
+        'repeat': repeat,
+        'wall_time_ms': round(statistics.median(wall_times), 2),
+        'wall_time_min_ms': round(min(wall_times), 2),
+        'stages_ms': {
+            name: round(statistics.median(stages.get(name, 0) for stages in stage_runs), 2)
+            for name in stage_names
+        },
+        'peak_memory_mb': round(peak_memory_mb, 3),
+        'output_bytes': output_bytes,
+    }
+
+
+def case_key(case):
+    return f"{case['language']}:{case['transactions']}"
+
+
+def compare_results(results, baseline, thresholds=None):
+    """Compare cases against a baseline, returning a list of regression messages"""
+    thresholds = thresholds or DEFAULT_THRESHOLDS
+    baseline_cases = {case_key(case): case for case in baseline.get('cases', [])}
+    regressions = []
+
+    for case in results.get('cases', []):
+        previous = baseline_cases.get(case_key(case))
+        if previous is None:
+            continue
+        for metric, allowed in thresholds.items():
+            old_value = previous.get(metric)
+            new_value = case.get(metric)
+            if not old_value or new_value is None:
+                continue
+            change = (new_value - old_value) / old_value
+            if change > allowed:
+                regressions.append(
+                    f"{case_key(case)} {metric}: {old_value} -> {new_value} "
+                    f"(+{change:.1%}, allowed +{allowed:.0%})"
+                )
+    return regressions
+
+
+def run_benchmarks(languages, sizes, repeat):
+    cases = []
+    for size in sizes:
+        for language in languages:
+            # Fewer repeats for the largest statements to keep runs practical
+            case_repeat = repeat if size < 10000 else max(1, repeat // 3)
+            case = run_case(language, size, case_repeat)
+            print(
+                f"{language} {size:>6} transactions: {case['wall_time_ms']:>10.2f} ms, "
+                f"peak {case['peak_memory_mb']:.2f} MB, {case['output_bytes']} bytes"
+            )
+            cases.append(case)
+
+    return {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'reportlab': reportlab.Version,
+            'gc_mode': memory_governor.mode,
+        },
+        'cases': cases,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark StatementPDFGenerator")
+    parser.add_argument('--languages', nargs='+', default=DEFAULT_LANGUAGES)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'results.json'),
+                        help="Where to write the results (default benchmark_results/results.json)")
+    parser.add_argument('--baseline', help="Baseline results to compare against")
+    parser.add_argument('--save-baseline', help="Also write the results to this baseline file")
+    for metric, allowed in DEFAULT_THRESHOLDS.items():
+        parser.add_argument(f"--max-{metric.replace('_', '-')}-regression", type=float, default=allowed,
+                            dest=f"threshold_{metric}")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    results = run_benchmarks(args.languages, args.sizes, args.repeat)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        thresholds = {metric: getattr(args, f"threshold_{metric}") for metric in DEFAULT_THRESHOLDS}
+        regressions = compare_results(results, baseline, thresholds)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
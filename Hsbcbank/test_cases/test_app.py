@@ -0,0 +1,307 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+TEMP_DIR = tempfile.mkdtemp()
+app = None
+asgi = None
+
+def setUpModule():
+    # The app configures its database and statement store and starts its worker
+    # threads on import, so import it after collection (test_load's locust import
+    # monkey-patches threading)
+    global app, asgi
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEMP_DIR, 'app.db')}"
+    os.environ['STATEMENT_STORE_DIR'] = os.path.join(TEMP_DIR, 'statements')
+    os.environ['JOB_SPOOL_DIR'] = os.path.join(TEMP_DIR, 'jobs')
+    os.environ.setdefault('SESSION_SECRET', 'test secret')
+    import app
+    import asgi
+
+def tearDownModule():
+    app.statement_store.shutdown()
+    app.job_queue.shutdown()
+    app.engine.dispose()
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+CARDHOLDER = {'name': 'Test User', 'card_number': '4111111111111111', 'email': 'test@example.com', 'phone': '1234567890'}
+
+class TestLedgerStatements(unittest.TestCase):
+    def persist(self, data, statement_date):
+        db_session = app.Session()
+        try:
+            cardholder, statement, transactions = app.persist_statement(db_session, data, statement_date)
+            db_session.commit()
+            return statement, transactions
+        finally:
+            db_session.close()
+
+    def test_rendered_rows_match_ledger_summary(self):
+        period = {'summary_mode': 'ledger', 'period_start': '2025-03-01', 'period_end': '2025-03-31'}
+        self.persist(dict(CARDHOLDER, **period, transactions=[
+            {'date': '2025-03-02', 'description': 'Earlier purchase', 'amount': 1500.0},
+            {'date': '2025-03-05', 'description': 'Earlier payment', 'amount': -400.0},
+        ]), app.datetime.date(2025, 3, 31))
+
+        statement, transactions = self.persist(dict(CARDHOLDER, **period, transactions=[
+            {'date': '2025-03-20', 'description': 'New purchase', 'amount': 250.0},
+        ]), app.datetime.date(2025, 3, 31))
+
+        self.assertEqual([tx.description for tx in transactions],
+                         ['Earlier purchase', 'Earlier payment', 'New purchase'])
+        self.assertEqual(sum(tx.amount for tx in transactions if tx.amount > 0), statement.purchases_charges)
+        self.assertEqual(sum(-tx.amount for tx in transactions if tx.amount < 0), statement.payments_received)
+
+    def test_reward_points_carry_over_unless_sent(self):
+        cardholder = dict(CARDHOLDER, card_number='4555555555555555', summary_mode='ledger')
+        self.persist(dict(cardholder, period_start='2025-02-01', period_end='2025-02-28', reward_points=500),
+                     app.datetime.date(2025, 2, 28))
+
+        statement, _ = self.persist(dict(cardholder, period_start='2025-03-01', period_end='2025-03-31'),
+                                    app.datetime.date(2025, 3, 31))
+        self.assertEqual(statement.reward_points, 500)
+        statement, _ = self.persist(dict(cardholder, period_start='2025-04-01', period_end='2025-04-30',
+                                         reward_points=650), app.datetime.date(2025, 4, 30))
+        self.assertEqual(statement.reward_points, 650)
+
+class TestGenerateStatement(unittest.TestCase):
+    def test_cached_statement_reuses_stored_file(self):
+        client = app.app.test_client()
+        payload = dict(CARDHOLDER, card_number='4222222222222222', transactions=[
+            {'date': '2025-03-02', 'description': 'Purchase', 'amount': 99.0},
+        ])
+        first = client.post('/api/generate-statement', json=payload).get_json()
+        etag = client.get(first['download_url']).headers['ETag']
+        files = app.statement_store.get_stats()['files']
+        second = client.post('/api/generate-statement', json=payload).get_json()
+
+        stored_id = lambda result: app.download_tokens.resolve(result['download_url'].rsplit('/', 1)[1])
+        self.assertTrue(second['cached'])
+        self.assertEqual(stored_id(second), stored_id(first))
+        self.assertEqual(app.statement_store.get_stats()['files'], files)
+        self.assertEqual(client.get(second['download_url']).status_code, 200)
+        # Renewing the file on the cache hit keeps links already handed out revalidating
+        self.assertEqual(client.get(first['download_url'], headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_cardholder_statement_needs_signed_link(self):
+        client = app.app.test_client()
+        result = client.post('/api/generate-statement', json=dict(CARDHOLDER, card_number='4333333333333333')).get_json()
+        url = result['cardholder_statement_url']
+
+        response = client.get(url, query_string={'from': '2025-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/pdf')
+
+        cardholder_id = app.cardholder_tokens.resolve(url.split('/')[3])
+        self.assertEqual(client.get(f'/api/cardholders/{cardholder_id}/statement').status_code, 404)
+        # A download token is not a cardholder token
+        download_token = app.download_tokens.issue(cardholder_id)
+        self.assertEqual(client.get(f'/api/cardholders/{download_token}/statement').status_code, 404)
+
+    def test_finished_job_links_to_signed_download(self):
+        client = app.app.test_client()
+        queued = client.post('/api/generate-statement?async=1', json=dict(CARDHOLDER, card_number='4666666666666666'))
+        self.assertEqual(queued.status_code, 202)
+        status_url = queued.get_json()['status_url']
+
+        deadline = time.time() + 30
+        job = client.get(status_url).get_json()
+        while job['status'] not in ('succeeded', 'failed') and time.time() < deadline:
+            time.sleep(0.05)
+            job = client.get(status_url).get_json()
+        self.assertEqual(job['status'], 'succeeded', job['error'])
+
+        self.assertTrue(job['download_url'].startswith('/download-statement/'))
+        self.assertEqual(client.get(job['download_url']).status_code, 200)
+        self.assertEqual(client.get(f"{status_url}/download").status_code, 404)
+
+class TestPreviewStatement(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def preview(self, data, **headers):
+        return self.client.post('/preview-statement', json=data, headers=headers)
+
+    def test_repeated_preview_is_served_from_cache(self):
+        data = dict(CARDHOLDER, name='Cache Hit')
+        first = self.preview(data)
+        hits = app.preview_cache.get_stats()['hits']
+        second = self.preview(data)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(app.preview_cache.get_stats()['hits'], hits + 1)
+
+    def test_matching_etag_gets_304(self):
+        data = dict(CARDHOLDER, name='Revalidated')
+        etag = self.preview(data).headers['ETag']
+        self.assertTrue(etag.startswith('W/'))
+
+        response = self.preview(data, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+        self.assertEqual(self.preview(dict(data, name='Changed'), **{'If-None-Match': etag}).status_code, 200)
+
+    def test_etag_matches_across_encodings(self):
+        data = dict(CARDHOLDER, name='Compressed')
+        identity = self.preview(data, **{'Accept-Encoding': 'identity'})
+        compressed = self.preview(data, **{'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', identity.headers)
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed.headers['ETag'], identity.headers['ETag'])
+
+        response = self.preview(data, **{'Accept-Encoding': 'identity', 'If-None-Match': compressed.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_equivalent_payloads_share_a_preview(self):
+        self.assertEqual(app.preview_number('175'), 175.0)
+        self.assertEqual(app.preview_number('n/a'), 'n/a')
+
+        data = dict(CARDHOLDER, name='Normalised')
+        etag = self.preview(data).headers['ETag']
+        self.assertEqual(self.preview(dict(data, reward_points=175)).headers['ETag'], etag)
+        self.assertEqual(self.preview(dict(data, reward_points='175.0')).headers['ETag'], etag)
+        self.assertNotEqual(self.preview(dict(data, reward_points=200)).headers['ETag'], etag)
+
+    def test_billing_address_is_escaped_with_line_breaks(self):
+        self.assertEqual(str(app.nl2br('<b>Flat 1</b>\nMain Road')), '&lt;b&gt;Flat 1&lt;/b&gt;<br>\nMain Road')
+        self.assertEqual(str(app.nl2br(None)), '')
+
+        response = self.preview(dict(CARDHOLDER, billing_address='<script>x</script>\nMumbai'))
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        self.assertIn('&lt;script&gt;x&lt;/script&gt;<br>\nMumbai', html)
+        self.assertNotIn('<script>x', html)
+
+class SlowUpload(io.BytesIO):
+    """Request body read a few bytes at a time, noting whether the database could be written meanwhile"""
+
+    def __init__(self, body, database_path):
+        super().__init__(body)
+        self.database_path = database_path
+        self.locked_reads = 0
+
+    def check_lock(self):
+        connection = sqlite3.connect(self.database_path, timeout=0)
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.rollback()
+        except sqlite3.OperationalError:
+            self.locked_reads += 1
+        finally:
+            connection.close()
+
+    def read(self, size=-1):
+        self.check_lock()
+        return super().read(16 if size is None or size < 0 else min(size, 16))
+
+    def readinto(self, buffer):
+        self.check_lock()
+        return super().readinto(memoryview(buffer)[:16])
+
+class TestUploadStatement(unittest.TestCase):
+    def upload(self, lines, card_number):
+        body = SlowUpload(b''.join(lines), os.path.join(TEMP_DIR, 'app.db'))
+        response = app.app.test_client().post(
+            '/api/upload-statement', query_string=dict(CARDHOLDER, card_number=card_number),
+            input_stream=body, content_type='application/x-ndjson'
+        )
+        return response, body
+
+    def test_database_is_not_locked_while_receiving(self):
+        lines = [json.dumps({'date': '2025-03-02', 'description': f'Item {i}', 'amount': i}).encode() + b'\n'
+                 for i in range(1, 6)]
+        response, body = self.upload(lines, '4444333322221111')
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(response.get_json()['transaction_count'], 5)
+        self.assertEqual(body.locked_reads, 0)
+
+    def test_invalid_row_stores_nothing(self):
+        lines = [b'{"date": "2025-03-02", "amount": 1}\n', b'{"date": "2025-03-02"}\n']
+        response, _ = self.upload(lines, '4444333322220000')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['line'], 2)
+        db_session = app.Session()
+        try:
+            self.assertIsNone(db_session.query(app.Cardholder).filter_by(card_number='4444333322220000').first())
+        finally:
+            db_session.close()
+
+class TestAsgiGenerateStatement(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from starlette.testclient import TestClient
+        # Entering the client runs the lifespan, which stops the render pool on exit
+        cls.client = TestClient(asgi.application).__enter__()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def generate(self, card_number, query=None, **options):
+        payload = dict(CARDHOLDER, card_number=card_number, transactions=[
+            {'date': '2025-03-02', 'description': 'Purchase', 'amount': 120.0},
+            {'date': '2025-03-09', 'description': 'Payment', 'amount': -20.0},
+        ], **options)
+        return self.client.post('/api/generate-statement', params=query, json=payload)
+
+    def stored_cardholder(self, card_number):
+        db_session = app.Session()
+        try:
+            return db_session.query(app.Cardholder).filter_by(card_number=card_number).first()
+        finally:
+            db_session.close()
+
+    def assert_downloadable(self, result):
+        response = self.client.get(result['download_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_sync(self):
+        response = self.generate('5105105105105100', persistence='sync')
+        self.assertEqual(response.status_code, 200, response.text)
+        result = response.json()
+        self.assert_downloadable(result)
+        self.assertIn('cardholder_statement_url', result)
+        self.assertIsNotNone(self.stored_cardholder('5105105105105100'))
+
+    def test_write_behind(self):
+        response = self.generate('5105105105105101', persistence='write_behind')
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assert_downloadable(response.json())
+        app.write_behind_queue.flush()
+        self.assertIsNotNone(self.stored_cardholder('5105105105105101'))
+
+    def test_ephemeral(self):
+        response = self.generate('5105105105105102', persistence='ephemeral')
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assert_downloadable(response.json())
+        self.assertIsNone(self.stored_cardholder('5105105105105102'))
+
+    def test_ledger(self):
+        response = self.generate('5105105105105103', summary_mode='ledger',
+                                 period_start='2025-03-01', period_end='2025-03-31')
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assert_downloadable(response.json())
+        db_session = app.Session()
+        try:
+            cardholder = db_session.query(app.Cardholder).filter_by(card_number='5105105105105103').one()
+            statement = db_session.query(app.Statement).filter_by(cardholder_id=cardholder.id).one()
+            self.assertEqual((statement.purchases_charges, statement.payments_received), (120.0, 20.0))
+        finally:
+            db_session.close()
+
+    def test_stream(self):
+        response = self.generate('5105105105105104', query={'stream': '1'})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.headers['content-type'], 'application/pdf')
+        self.assertIn('ETag', response.headers)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+if __name__ == '__main__':
+    unittest.main()
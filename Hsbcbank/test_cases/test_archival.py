@@ -0,0 +1,107 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import create_engine, func, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+from models import Base, Transaction, TransactionArchiveMonth
+from repository import aggregate_transactions, bulk_insert_transactions, get_period_transactions, upsert_cardholder
+from archival import add_months, archive_closed_cycles, period_transactions
+
+TODAY = datetime.date(2025, 6, 15)
+
+class TestArchival(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.temp_dir, 'test.db')}")
+        Base.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+
+        session = self.Session()
+        self.cardholder_id = upsert_cardholder(session, {'card_number': "1234567890123456"}).id
+        # Ten transactions on the 5th of every month from January to June
+        bulk_insert_transactions(session, self.cardholder_id, [
+            {'date': f'2025-{month:02d}-05', 'description': f'Month {month} #{i}', 'amount': month * 10 + i}
+            for month in range(1, 7) for i in range(10)
+        ])
+        session.commit()
+        session.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def hot_count(self):
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.count()).select_from(Transaction.__table__)).scalar()
+
+    def test_add_months(self):
+        self.assertEqual(add_months(datetime.date(2025, 1, 31), -1), datetime.date(2024, 12, 1))
+        self.assertEqual(add_months(datetime.date(2025, 11, 2), 3), datetime.date(2026, 2, 1))
+
+    def test_closed_cycles_move_to_monthly_tables(self):
+        session = self.Session()
+        start, end = datetime.date(2025, 1, 1), datetime.date(2025, 6, 30)
+        expected_totals = aggregate_transactions(session, [self.cardholder_id], start, end)
+        expected_rows = get_period_transactions(session, self.cardholder_id, start, end)
+        session.close()
+
+        # Keep March to June hot
+        moved = archive_closed_cycles(self.engine, keep_months=3, today=TODAY)
+        self.assertEqual(moved, {datetime.date(2025, 1, 1): 10, datetime.date(2025, 2, 1): 10})
+        self.assertEqual(self.hot_count(), 40)
+        tables = inspect(self.engine).get_table_names()
+        self.assertIn('transactions_archive_2025_01', tables)
+        self.assertIn('transactions_archive_2025_02', tables)
+        self.assertNotIn('transactions_archive_2024_12', tables)
+
+        session = self.Session()
+        self.assertEqual(aggregate_transactions(session, [self.cardholder_id], start, end), expected_totals)
+        self.assertEqual(get_period_transactions(session, self.cardholder_id, start, end), expected_rows)
+        self.assertEqual(len(get_period_transactions(session, self.cardholder_id,
+                                                     datetime.date(2025, 2, 1), datetime.date(2025, 2, 28))), 10)
+
+        # Hot-only periods do not touch the archive
+        hot_source = str(period_transactions(session, [self.cardholder_id],
+                                             datetime.date(2025, 4, 1), datetime.date(2025, 4, 30)))
+        self.assertNotIn('transactions_archive', hot_source)
+        self.assertEqual(session.query(TransactionArchiveMonth).count(), 2)
+        session.close()
+
+    def test_rerun_moves_late_transactions(self):
+        archive_closed_cycles(self.engine, keep_months=3, today=TODAY)
+        self.assertEqual(archive_closed_cycles(self.engine, keep_months=3, today=TODAY), {})
+
+        session = self.Session()
+        bulk_insert_transactions(session, self.cardholder_id, [{'date': '2025-01-20', 'amount': 1}])
+        session.commit()
+        session.close()
+
+        self.assertEqual(archive_closed_cycles(self.engine, keep_months=3, today=TODAY),
+                         {datetime.date(2025, 1, 1): 1})
+        with self.engine.connect() as connection:
+            archived = connection.execute(text("SELECT COUNT(*) FROM transactions_archive_2025_01")).scalar()
+        self.assertEqual(archived, 11)
+
+    def test_reingested_transactions_archive_again(self):
+        # Archive everything, so the hot table is empty when the same transactions arrive again
+        self.assertEqual(sum(archive_closed_cycles(self.engine, keep_months=0, today=datetime.date(2025, 7, 1)).values()), 60)
+        self.assertEqual(self.hot_count(), 0)
+
+        session = self.Session()
+        bulk_insert_transactions(session, self.cardholder_id, [
+            {'date': f'2025-{month:02d}-05', 'description': f'Again {month}', 'amount': month}
+            for month in range(1, 7)
+        ])
+        session.commit()
+        session.close()
+
+        self.assertEqual(sum(archive_closed_cycles(self.engine, keep_months=0, today=datetime.date(2025, 7, 1)).values()), 6)
+        session = self.Session()
+        self.assertEqual(len(get_period_transactions(session, self.cardholder_id,
+                                                     datetime.date(2025, 1, 1), datetime.date(2025, 6, 30))), 66)
+        session.close()
+
+if __name__ == '__main__':
+    unittest.main()
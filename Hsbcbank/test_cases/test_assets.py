@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask, jsonify, request, send_file
+from werkzeug.http import parse_accept_header
+import assets
+from assets import accepted_encoding, build_assets, compress_response, load_manifest, send_asset
+
+CSS = b'body { color: #db0011; }\n' * 20
+
+class TestBuildAssets(unittest.TestCase):
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.dist_dir = os.path.join(self.static_dir, 'dist')
+        os.makedirs(os.path.join(self.static_dir, 'css'))
+        with open(os.path.join(self.static_dir, 'css', 'styles.css'), 'wb') as css_file:
+            css_file.write(CSS)
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir, ignore_errors=True)
+
+    def test_hashed_copies_and_manifest(self):
+        manifest = build_assets(self.static_dir, self.dist_dir, ['css/styles.css'])
+        name = manifest['css/styles.css']
+        self.assertRegex(name, r'^css/styles\.[0-9a-f]{12}\.css$')
+        self.assertEqual(load_manifest(self.dist_dir), manifest)
+
+        path = os.path.join(self.dist_dir, name)
+        with open(path, 'rb') as built:
+            self.assertEqual(built.read(), CSS)
+        with open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), CSS)
+        self.assertEqual(os.path.exists(path + '.br'), assets.brotli is not None)
+
+        # Same content, same name and bytes
+        with open(path + '.gz', 'rb') as compressed:
+            first_build = compressed.read()
+        self.assertEqual(build_assets(self.static_dir, self.dist_dir, ['css/styles.css']), manifest)
+        with open(path + '.gz', 'rb') as compressed:
+            self.assertEqual(compressed.read(), first_build)
+
+    def test_missing_manifest(self):
+        self.assertEqual(load_manifest(self.dist_dir), {})
+
+    def test_hashed_asset_served_with_best_encoding(self):
+        name = build_assets(self.static_dir, self.dist_dir, ['css/styles.css'])['css/styles.css']
+        app = Flask(__name__)
+        app.add_url_rule('/assets/<path:filename>', 'asset',
+                         lambda filename: send_asset(filename, request.accept_encodings, self.dist_dir))
+        client = app.test_client()
+
+        response = client.get(f'/assets/{name}', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), CSS)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/css'))
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('max-age=31536000', response.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        response = client.get(f'/assets/{name}', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, CSS)
+
+        self.assertEqual(client.get('/assets/../css/styles.css').status_code, 404)
+        self.assertEqual(client.get('/assets/css/missing.css').status_code, 404)
+
+class TestCompressResponse(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        payload = {'values': list(range(500))}
+        app.add_url_rule('/large', 'large', lambda: jsonify(payload))
+        app.add_url_rule('/small', 'small', lambda: jsonify({'ok': True}))
+        app.add_url_rule('/file', 'file', lambda: send_file(__file__, mimetype='application/json'))
+        app.after_request(lambda response: compress_response(response, request.accept_encodings, 1024))
+        self.client = app.test_client()
+        self.payload = payload
+
+    def test_large_json_compressed(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.data)), self.payload)
+        self.assertEqual(response.headers['Content-Length'], str(len(response.data)))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+    def test_uncompressed_when_small_unaccepted_or_passthrough(self):
+        self.assertNotIn('Content-Encoding', self.client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/large').headers)
+        self.assertNotIn('Content-Encoding', self.client.get('/file', headers={'Accept-Encoding': 'gzip'}).headers)
+
+    def test_strong_etag_weakened(self):
+        app = Flask(__name__)
+
+        @app.route('/tagged')
+        def tagged():
+            response = jsonify(self.payload)
+            response.set_etag('abc')
+            return response
+
+        app.after_request(lambda response: compress_response(response, request.accept_encodings))
+        response = app.test_client().get('/tagged', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['ETag'], 'W/"abc"')
+
+    def test_accepted_encoding_preference(self):
+        self.assertEqual(accepted_encoding(parse_accept_header('gzip, br'), ('br', 'gzip')), 'br')
+        self.assertEqual(accepted_encoding(parse_accept_header('gzip, br'), ('gzip',)), 'gzip')
+        self.assertEqual(accepted_encoding(parse_accept_header('br;q=0, gzip'), ('br', 'gzip')), 'gzip')
+        self.assertEqual(accepted_encoding(parse_accept_header('*'), ('gzip',)), 'gzip')
+        self.assertIsNone(accepted_encoding(parse_accept_header('identity'), ('br', 'gzip')))
+
+if __name__ == '__main__':
+    unittest.main()
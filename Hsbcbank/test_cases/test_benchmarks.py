@@ -0,0 +1,27 @@
+import unittest
+from run_benchmarks import compare_results, run_case
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare_results_flags_regressions(self):
+        baseline = {'cases': [
+            {'language': 'en', 'transactions': 10, 'wall_time_ms': 100, 'peak_memory_mb': 1.0, 'output_bytes': 1000}
+        ]}
+        results = {'cases': [
+            {'language': 'en', 'transactions': 10, 'wall_time_ms': 120, 'peak_memory_mb': 1.1, 'output_bytes': 1000},
+            {'language': 'ta', 'transactions': 10, 'wall_time_ms': 999, 'peak_memory_mb': 9.9, 'output_bytes': 9999}
+        ]}
+        regressions = compare_results(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('en:10 wall_time_ms', regressions[0])
+        self.assertEqual(compare_results(results, baseline, {'wall_time_ms': 0.25}), [])
+
+    def test_run_case_records_metrics(self):
+        case = run_case('ta', 10, 1)
+        self.assertEqual((case['language'], case['transactions']), ('ta', 10))
+        self.assertGreater(case['wall_time_ms'], 0)
+        self.assertGreater(case['output_bytes'], 0)
+        self.assertGreater(case['peak_memory_mb'], 0)
+        self.assertIn('build_document', case['stages_ms'])
+
+if __name__ == '__main__':
+    unittest.main()
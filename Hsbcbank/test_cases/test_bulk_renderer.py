@@ -0,0 +1,79 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import datetime
+from models import Cardholder, Transaction, Statement
+from bulk_renderer import BulkStatementRenderer, job_from_models
+
+def gevent_patched():
+    """Locust (test_load.py) monkey-patches the interpreter, which breaks process pools"""
+    if 'gevent.monkey' not in sys.modules:
+        return False
+    return sys.modules['gevent.monkey'].is_anything_patched()
+
+class TestBulkRenderer(unittest.TestCase):
+    def setUp(self):
+        if gevent_patched():
+            self.skipTest("process pools are unavailable under gevent monkey-patching")
+        self.output_dir = tempfile.mkdtemp()
+        self.cardholder = Cardholder(
+            name="Test User",
+            card_number="1234567890123456",
+            billing_address="123 Test St",
+            email="test@example.com",
+            phone="1234567890"
+        )
+        self.transactions = [
+            Transaction(date=datetime.date(2024, 4, 1), description="Test Purchase", amount=100.00)
+        ]
+        self.statement = Statement(
+            statement_date=datetime.date(2024, 4, 1),
+            previous_balance=1000.00,
+            payments_received=500.00,
+            purchases_charges=100.00,
+            finance_charges=10.00,
+            new_balance=610.00,
+            credit_limit=5000.00,
+            available_credit=4390.00,
+            payment_due_date=datetime.date(2024, 4, 21),
+            reward_points=100
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_renders_jobs_and_isolates_failures(self):
+        jobs = [
+            job_from_models(self.statement, self.cardholder, self.transactions, lang,
+                            os.path.join(self.output_dir, f"statement_{lang}.pdf"), job_id=lang)
+            for lang in ['en', 'ta', 'hi']
+        ]
+        broken_job = job_from_models(self.statement, self.cardholder, self.transactions, 'en', job_id='broken')
+        del broken_job['statement']['previous_balance']
+        jobs.append(broken_job)
+
+        with BulkStatementRenderer(max_workers=2, max_in_flight=2) as renderer:
+            results = {result.job_id: result for result in renderer.render(jobs)}
+
+        self.assertEqual(set(results), {'en', 'ta', 'hi', 'broken'})
+        for lang in ['en', 'ta', 'hi']:
+            self.assertTrue(results[lang].success)
+            self.assertTrue(os.path.exists(results[lang].output_path))
+            self.assertEqual(results[lang].bytes_written, os.path.getsize(results[lang].output_path))
+        self.assertFalse(results['broken'].success)
+        self.assertIn('previous_balance', results['broken'].error)
+
+    def test_returns_bytes_without_output_path(self):
+        job = job_from_models(self.statement, self.cardholder, self.transactions, 'en')
+        job['statement']['statement_date'] = '2024-04-01'
+        with BulkStatementRenderer(max_workers=1) as renderer:
+            results = list(renderer.render([job]))
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].success)
+        self.assertEqual(results[0].job_id, 0)
+        self.assertTrue(results[0].pdf_bytes.startswith(b'%PDF'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import text
+from database import create_configured_engine, get_engine_config, resolve_database_uri, to_async_uri
+
+class TestDatabaseConfig(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_uri = f"sqlite:///{os.path.join(self.temp_dir, 'test.db')}"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_postgres_scheme_is_normalised(self):
+        self.assertEqual(resolve_database_uri('postgres://u:p@host/db'), 'postgresql://u:p@host/db')
+
+    def test_async_uri_uses_asyncio_driver(self):
+        self.assertEqual(to_async_uri('sqlite:///credit_card.db'), 'sqlite+aiosqlite:///credit_card.db')
+        self.assertEqual(to_async_uri('postgresql://u:p@host/db'), 'postgresql+asyncpg://u:p@host/db')
+        self.assertEqual(to_async_uri('postgresql+psycopg2://u:p@host/db'), 'postgresql+asyncpg://u:p@host/db')
+        with self.assertRaises(ValueError):
+            to_async_uri('mysql://u:p@host/db')
+
+    def test_pool_settings_from_environment(self):
+        env = {'DB_POOL_SIZE': '12', 'DB_MAX_OVERFLOW': '3', 'DB_POOL_RECYCLE': '60', 'DB_POOL_PRE_PING': 'false'}
+        with mock.patch.dict(os.environ, env):
+            config = get_engine_config('postgresql://u:p@host/db')
+        self.assertEqual(config['pool']['pool_size'], 12)
+        self.assertEqual(config['pool']['max_overflow'], 3)
+        self.assertEqual(config['pool']['pool_recycle'], 60)
+        self.assertFalse(config['pool']['pool_pre_ping'])
+        self.assertEqual(config['sqlite_pragmas'], {})
+
+    def test_in_memory_sqlite_skips_pool_sizing_and_wal(self):
+        config = get_engine_config('sqlite://')
+        self.assertEqual(config['pool'], {})
+        self.assertNotIn('journal_mode', config['sqlite_pragmas'])
+
+    def test_invalid_pragma_value_rejected(self):
+        with mock.patch.dict(os.environ, {'SQLITE_JOURNAL_MODE': 'WAL; DROP TABLE x'}):
+            with self.assertRaises(ValueError):
+                get_engine_config(self.database_uri)
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with mock.patch.dict(os.environ, {'SQLITE_BUSY_TIMEOUT_MS': '1234'}):
+            engine = create_configured_engine(self.database_uri)
+        try:
+            with engine.connect() as connection:
+                self.assertEqual(connection.execute(text("PRAGMA journal_mode")).scalar(), 'wal')
+                # NORMAL
+                self.assertEqual(connection.execute(text("PRAGMA synchronous")).scalar(), 1)
+                self.assertEqual(connection.execute(text("PRAGMA busy_timeout")).scalar(), 1234)
+            self.assertEqual(engine.pool.size(), 5)
+        finally:
+            engine.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+import unittest
+from flask import Flask
+from downloads import DownloadTokens, pdf_etag, send_statement
+
+PDF_BYTES = b'%PDF-1.4\n' + bytes(range(256)) * 40
+
+class TestSendStatement(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.pdf_path = os.path.join(self.temp_dir, 'statement.pdf')
+        with open(self.pdf_path, 'wb') as pdf_file:
+            pdf_file.write(PDF_BYTES)
+
+        app = Flask(__name__)
+        app.add_url_rule('/memory', 'memory', lambda: send_statement(PDF_BYTES, 'statement.pdf'))
+        app.add_url_rule('/file', 'file', lambda: send_statement(self.pdf_path, 'statement.pdf'))
+        app.add_url_rule('/stored', 'stored', lambda: send_statement(self.pdf_path, 'statement.pdf', etag='stored-id'))
+        self.client = app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_in_memory_pdf_has_content_etag(self):
+        response = self.client.get('/memory')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, PDF_BYTES)
+        self.assertEqual(response.headers['ETag'], f'"{pdf_etag(PDF_BYTES)}"')
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertIn('private', response.headers['Cache-Control'])
+        self.assertIn('attachment; filename=statement.pdf', response.headers['Content-Disposition'])
+
+    def test_matching_etag_is_not_modified(self):
+        for path in ('/memory', '/file'):
+            with self.subTest(path=path):
+                etag = self.client.get(path).headers['ETag']
+                response = self.client.get(path, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.data, b'')
+
+    def test_range_resumes_download(self):
+        for path in ('/memory', '/file'):
+            with self.subTest(path=path):
+                etag = self.client.get(path).headers['ETag']
+                response = self.client.get(path, headers={'Range': 'bytes=1000-', 'If-Range': etag})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response.headers['Content-Range'], f'bytes 1000-{len(PDF_BYTES) - 1}/{len(PDF_BYTES)}')
+                self.assertEqual(response.data, PDF_BYTES[1000:])
+
+    def test_stored_file_etag_survives_renewal(self):
+        etag = self.client.get('/stored').headers['ETag']
+        self.assertEqual(etag, '"stored-id"')
+        # The statement store renews a file by moving its mtime forward
+        os.utime(self.pdf_path, (1e9, 2e9))
+        self.assertEqual(self.client.get('/stored').headers['ETag'], etag)
+        response = self.client.get('/stored', headers={'Range': 'bytes=1000-', 'If-Range': etag})
+        self.assertEqual(response.status_code, 206)
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get('/memory', headers={'Range': 'bytes=1000-', 'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, PDF_BYTES)
+
+class TestDownloadTokens(unittest.TestCase):
+    def test_token_round_trip(self):
+        tokens = DownloadTokens('secret', max_age=60)
+        token = tokens.issue('0b9a6a6e-2f4e-4c55-9d55-3d0d5e1f2a11')
+        self.assertEqual(tokens.resolve(token), '0b9a6a6e-2f4e-4c55-9d55-3d0d5e1f2a11')
+        # Any worker with the same secret can resolve it
+        self.assertEqual(DownloadTokens('secret', max_age=60).resolve(token), tokens.resolve(token))
+
+    def test_forged_and_expired_tokens_rejected(self):
+        token = DownloadTokens('secret', max_age=60).issue('some-id')
+        self.assertIsNone(DownloadTokens('other secret', max_age=60).resolve(token))
+        self.assertIsNone(DownloadTokens('secret', max_age=60).resolve(token[:-2] + 'xx'))
+        self.assertIsNone(DownloadTokens('secret', max_age=60).resolve('some-id'))
+        self.assertIsNone(DownloadTokens('secret', max_age=-1).resolve(token))
+        self.assertIsNone(DownloadTokens('secret', max_age=60, salt='other').resolve(token))
+
+if __name__ == '__main__':
+    unittest.main()
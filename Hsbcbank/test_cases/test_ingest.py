@@ -0,0 +1,111 @@
+import datetime
+import io
+import unittest
+from unittest import mock
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from models import Base, Transaction
+from ingest import TransactionSpool, UploadError, ingest_transactions, iter_csv, iter_ndjson, upload_format
+
+class TestUploadParsing(unittest.TestCase):
+    def test_upload_format(self):
+        self.assertEqual(upload_format('application/x-ndjson'), 'ndjson')
+        self.assertEqual(upload_format('text/csv'), 'csv')
+        self.assertIsNone(upload_format('application/json'))
+
+    def test_ndjson_rows(self):
+        stream = io.BytesIO(
+            b'{"date": "2025-03-02", "description": "Caf\xc3\xa9", "amount": 12.5}\n'
+            b'\n'
+            b'{"date": "2025-03-03", "amount": "-4"}\n'
+        )
+        self.assertEqual(list(iter_ndjson(stream)), [
+            {'date': datetime.date(2025, 3, 2), 'description': 'Café', 'amount': 12.5},
+            {'date': datetime.date(2025, 3, 3), 'description': 'Transaction', 'amount': -4.0},
+        ])
+
+    def test_csv_rows(self):
+        stream = io.BytesIO(b'date,description,amount\r\n2025-03-02,"Shop, Delhi",499\r\n')
+        self.assertEqual(list(iter_csv(stream)), [
+            {'date': datetime.date(2025, 3, 2), 'description': 'Shop, Delhi', 'amount': 499.0}
+        ])
+
+    def test_invalid_rows_report_their_line(self):
+        cases = [
+            (iter_ndjson, b'{"date": "2025-03-02", "amount": 1}\n{"date": "02/03/2025", "amount": 1}\n', 2),
+            (iter_ndjson, b'{"date": "2025-03-02", "amount": true}\n', 1),
+            (iter_ndjson, b'{"date": "2025-03-02", "amount": 1}\nnot json\n', 2),
+            (iter_ndjson, b'[1, 2]\n', 1),
+            (iter_csv, b'date,amount\n2025-03-02,1\n2025-03-02,nan\n', 3),
+            (iter_csv, b'when,amount\n2025-03-02,1\n', 1),
+        ]
+        for parser, body, line in cases:
+            with self.subTest(body=body):
+                with self.assertRaises(UploadError) as raised:
+                    list(parser(io.BytesIO(body)))
+                self.assertEqual(raised.exception.line, line)
+
+    def test_overlong_line_rejected(self):
+        with mock.patch('ingest.MAX_LINE_LENGTH', 50):
+            with self.assertRaises(UploadError):
+                list(iter_ndjson(io.BytesIO(b'{"date": "2025-03-02", "amount": 1, "description": "' + b'x' * 100 + b'"}\n')))
+
+class TestIngestTransactions(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def transactions(self, count):
+        for i in range(count):
+            yield {'date': datetime.date(2025, 3, 1 + i % 28), 'description': f'Item {i}', 'amount': float(i % 7 - 2)}
+
+    def test_rows_inserted_in_chunks_and_spooled(self):
+        with mock.patch('ingest.insert_transaction_rows') as insert_rows, TransactionSpool() as spool:
+            chunk_sizes = []
+            insert_rows.side_effect = lambda session, rows: chunk_sizes.append(len(rows))
+            totals = ingest_transactions(self.session, 1, self.transactions(25), chunk_size=10, spool=spool)
+            spooled = list(spool)
+
+        self.assertEqual(chunk_sizes, [10, 10, 5])
+        self.assertEqual(totals['transaction_count'], 25)
+        self.assertEqual(totals['first_date'], datetime.date(2025, 3, 1))
+        self.assertEqual(totals['last_date'], datetime.date(2025, 3, 25))
+        self.assertEqual(len(spooled), 25)
+        self.assertEqual((spooled[3].date, spooled[3].description, spooled[3].amount),
+                         (datetime.date(2025, 3, 4), 'Item 3', 1.0))
+
+    def test_spooled_records_insert_like_the_upload(self):
+        with TransactionSpool() as spool:
+            spool.extend(self.transactions(14))
+            totals = ingest_transactions(self.session, 1, spool.records(), chunk_size=4)
+        self.session.commit()
+        self.assertEqual(totals['transaction_count'], 14)
+        self.assertEqual(totals['purchases_charges'], 20.0)
+        stored = self.session.execute(select(func.count(), func.sum(Transaction.amount))).one()
+        self.assertEqual(tuple(stored), (14, 14.0))
+
+    def test_totals_and_stored_rows(self):
+        totals = ingest_transactions(self.session, 1, self.transactions(14), chunk_size=4)
+        self.session.commit()
+        # Amounts cycle through -2..4: each cycle has 10 of purchases and 3 of payments
+        self.assertEqual(totals['purchases_charges'], 20.0)
+        self.assertEqual(totals['payments_received'], 6.0)
+        stored = self.session.execute(select(func.count(), func.sum(Transaction.amount))).one()
+        self.assertEqual(tuple(stored), (14, 14.0))
+
+    def test_invalid_row_leaves_nothing_after_rollback(self):
+        stream = io.BytesIO(b''.join(
+            b'{"date": "2025-03-02", "amount": 1}\n' for _ in range(30)
+        ) + b'{"date": "2025-03-02"}\n')
+        with self.assertRaises(UploadError):
+            ingest_transactions(self.session, 1, iter_ndjson(stream), chunk_size=10)
+        self.session.rollback()
+        self.assertEqual(self.session.execute(select(func.count()).select_from(Transaction)).scalar(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import unittest
+import shutil
+import tempfile
+import time
+from unittest import mock
+from jobs import InProcessJobQueue, SpoolJobQueue, create_job_queue, JOB_QUEUED, JOB_SUCCEEDED, JOB_FAILED
+
+def handler(payload):
+    if payload.get('fail'):
+        raise ValueError('bad payload')
+    return {'total': sum(payload['values'])}
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in (JOB_SUCCEEDED, JOB_FAILED):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+class JobQueueTests:
+    def test_successful_job(self):
+        job_id = self.queue.submit({'values': [1, 2, 3]})
+        job = wait_for(self.queue, job_id)
+        self.assertEqual(job['status'], JOB_SUCCEEDED)
+        self.assertEqual(job['result'], {'total': 6})
+        self.assertIsNone(job['error'])
+
+    def test_failed_job(self):
+        job_id = self.queue.submit({'fail': True})
+        job = wait_for(self.queue, job_id)
+        self.assertEqual(job['status'], JOB_FAILED)
+        self.assertEqual(job['error'], 'bad payload')
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.queue.get('missing'))
+
+class TestInProcessJobQueue(JobQueueTests, unittest.TestCase):
+    def setUp(self):
+        self.queue = InProcessJobQueue(handler, max_workers=2)
+
+    def tearDown(self):
+        self.queue.shutdown()
+
+class TestSpoolJobQueue(JobQueueTests, unittest.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.queue = SpoolJobQueue(handler, self.spool_dir, max_workers=2, poll_interval=0.01)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.spool_dir)
+
+    def test_status_shared_between_queues(self):
+        # A second queue on the same spool directory, e.g. another gunicorn worker
+        other = SpoolJobQueue(handler, self.spool_dir, max_workers=0)
+        job_id = other.submit({'values': [4, 5]})
+        job = wait_for(other, job_id)
+        self.assertEqual(job['result'], {'total': 9})
+        other.shutdown()
+
+class TestSpoolJobQueueLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        # No workers, so claims only happen when a test makes them
+        self.queue = SpoolJobQueue(handler, self.spool_dir, max_workers=0, stale_seconds=60, max_attempts=2)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.spool_dir)
+
+    def later(self, seconds):
+        return time.time() + seconds
+
+    def test_claim_abandoned_by_a_dead_worker_is_requeued(self):
+        job_id = self.queue.submit({'values': [1, 2]})
+        # Claimed by a worker that is then killed
+        self.assertEqual(self.queue._claim()[0], job_id)
+        self.assertEqual(self.queue.sweep(), {'requeued': 0, 'failed': 0, 'pruned': 0})
+
+        self.assertEqual(self.queue.sweep(now=self.later(120))['requeued'], 1)
+        self.assertEqual(self.queue.get(job_id)['status'], JOB_QUEUED)
+        self.assertEqual(len(os.listdir(self.queue.queue_dir)), 1)
+
+        worker = SpoolJobQueue(handler, self.spool_dir, max_workers=1, poll_interval=0.01)
+        try:
+            self.assertEqual(wait_for(worker, job_id)['result'], {'total': 3})
+        finally:
+            worker.shutdown()
+
+    def test_claim_abandoned_too_often_fails(self):
+        job_id = self.queue.submit({'values': [1]})
+        self.queue._claim()
+        self.queue.sweep(now=self.later(120))
+        self.queue._claim()
+
+        self.assertEqual(self.queue.sweep(now=self.later(120))['failed'], 1)
+        job = self.queue.get(job_id)
+        self.assertEqual(job['status'], JOB_FAILED)
+        self.assertEqual(job['attempts'], 2)
+        self.assertEqual(os.listdir(self.queue.running_dir), [])
+
+    def test_live_claims_are_kept_fresh(self):
+        self.queue.submit({'values': [1]})
+        _, _, running_path = self.queue._claim()
+        os.utime(running_path, (0, 0))
+        self.queue._heartbeat()
+        self.assertGreater(os.stat(running_path).st_mtime, time.time() - 5)
+
+    def test_finished_records_expire(self):
+        finished_id = self.queue.submit({'values': [1]})
+        self.queue._update(finished_id, status=JOB_SUCCEEDED, result={'total': 1})
+        queued_id = self.queue.submit({'values': [2]})
+
+        self.assertEqual(self.queue.sweep(now=self.later(86400 + 60))['pruned'], 1)
+        self.assertIsNone(self.queue.get(finished_id))
+        self.assertEqual(self.queue.get(queued_id)['status'], JOB_QUEUED)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_spool_writable_by_others_is_refused(self):
+        os.chmod(self.spool_dir, 0o777)
+        with self.assertRaises(PermissionError):
+            SpoolJobQueue(handler, self.spool_dir, max_workers=0)
+
+class TestCreateJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    def test_spool_queue_is_the_default(self):
+        with mock.patch.dict(os.environ, {'JOB_SPOOL_DIR': self.spool_dir}):
+            os.environ.pop('JOB_BACKEND', None)
+            queue = create_job_queue(handler)
+        try:
+            self.assertIsInstance(queue, SpoolJobQueue)
+            self.assertEqual(os.stat(queue.queue_dir).st_mode & 0o777, 0o700)
+        finally:
+            queue.shutdown()
+
+    def test_unknown_backend_is_rejected(self):
+        with mock.patch.dict(os.environ, {'JOB_BACKEND': 'redis'}):
+            with self.assertRaises(ValueError):
+                create_job_queue(handler)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from unittest import mock
+from memory_governor import MemoryGovernor
+
+class TestMemoryGovernor(unittest.TestCase):
+    def test_threshold_mode_collects_only_above_limit(self):
+        governor = MemoryGovernor(max_memory_mb=100, sample_every=2, mode='threshold')
+        with mock.patch.object(governor, 'sample', return_value=50), \
+                mock.patch('memory_governor.gc.collect') as collect:
+            results = [governor.checkpoint() for _ in range(4)]
+        self.assertEqual(results, [False, False, False, False])
+        collect.assert_not_called()
+
+        with mock.patch.object(governor, 'sample', return_value=150), \
+                mock.patch('memory_governor.gc.collect') as collect:
+            results = [governor.checkpoint() for _ in range(4)]
+        self.assertEqual(results, [False, True, False, True])
+        self.assertEqual(collect.call_count, 2)
+        self.assertEqual(governor.get_stats()['collections'], 2)
+
+    def test_per_call_limit_overrides_default(self):
+        governor = MemoryGovernor(max_memory_mb=100, sample_every=1)
+        with mock.patch.object(governor, 'sample', return_value=150), \
+                mock.patch('memory_governor.gc.collect'):
+            self.assertFalse(governor.checkpoint(max_memory_mb=200))
+            self.assertTrue(governor.checkpoint())
+
+    def test_always_mode_collects_every_checkpoint(self):
+        governor = MemoryGovernor(mode='always')
+        with mock.patch('memory_governor.gc.collect') as collect:
+            for _ in range(3):
+                governor.checkpoint()
+        self.assertEqual(collect.call_count, 3)
+
+    def test_off_mode_never_collects(self):
+        governor = MemoryGovernor(max_memory_mb=1, sample_every=1, mode='off')
+        with mock.patch('memory_governor.gc.collect') as collect:
+            self.assertFalse(governor.checkpoint())
+        collect.assert_not_called()
+        self.assertEqual(governor.get_stats()['samples'], 1)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            MemoryGovernor(mode='sometimes')
+
+if __name__ == '__main__':
+    unittest.main()
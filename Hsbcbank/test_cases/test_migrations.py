@@ -0,0 +1,92 @@
+import unittest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from models import Base
+from migrations import apply_migrations, MIGRATIONS
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def index_names(self, table):
+        return {index['name'] for index in inspect(self.engine).get_indexes(table)}
+
+    def test_existing_database_gets_lookup_indexes(self):
+        # Tables as created before the indexes were declared
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE cardholders (id INTEGER PRIMARY KEY, card_number VARCHAR(20))"))
+            connection.execute(text("CREATE TABLE transactions (id INTEGER PRIMARY KEY, cardholder_id INTEGER, date DATE)"))
+            connection.execute(text("CREATE TABLE statements (id INTEGER PRIMARY KEY, cardholder_id INTEGER, statement_date DATE)"))
+
+        self.assertEqual(apply_migrations(self.engine), [m.version for m in MIGRATIONS])
+        self.assertIn('ix_transactions_cardholder_id_date', self.index_names('transactions'))
+        self.assertIn('ix_statements_cardholder_id_statement_date', self.index_names('statements'))
+        self.assertIn('uq_cardholders_card_number', self.index_names('cardholders'))
+
+        with self.engine.connect() as connection:
+            plan = connection.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM transactions WHERE cardholder_id = 1 AND date >= '2025-03-01'"
+            )).all()
+        self.assertIn('ix_transactions_cardholder_id_date', ' '.join(row[-1] for row in plan))
+
+    def test_duplicate_cardholders_are_merged(self):
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE cardholders (id INTEGER PRIMARY KEY, card_number VARCHAR(20))"))
+            connection.execute(text("CREATE TABLE transactions (id INTEGER PRIMARY KEY, cardholder_id INTEGER, date DATE)"))
+            connection.execute(text("CREATE TABLE statements (id INTEGER PRIMARY KEY, cardholder_id INTEGER, statement_date DATE)"))
+            connection.execute(text("INSERT INTO cardholders VALUES (1, '1111'), (2, '2222'), (3, '1111'), (4, '1111')"))
+            connection.execute(text("INSERT INTO transactions (cardholder_id) VALUES (1), (2), (3), (4), (4)"))
+            connection.execute(text("INSERT INTO statements (cardholder_id) VALUES (3), (2)"))
+
+        apply_migrations(self.engine)
+
+        with self.engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT id FROM cardholders ORDER BY id")).scalars().all(), [1, 2])
+            self.assertEqual(connection.execute(text("SELECT cardholder_id FROM transactions ORDER BY id")).scalars().all(),
+                             [1, 2, 1, 1, 1])
+            self.assertEqual(connection.execute(text("SELECT cardholder_id FROM statements ORDER BY id")).scalars().all(),
+                             [1, 2])
+            with self.assertRaises(IntegrityError):
+                connection.execute(text("INSERT INTO cardholders (card_number) VALUES ('2222')"))
+        self.assertNotIn('ix_cardholders_card_number', self.index_names('cardholders'))
+
+    def test_sqlite_transaction_ids_stop_colliding_with_archives(self):
+        # Ids 1 and 2 were archived, then reused by the hot table
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE cardholders (id INTEGER PRIMARY KEY, card_number VARCHAR(20))"))
+            connection.execute(text("CREATE TABLE transactions (id INTEGER PRIMARY KEY, cardholder_id INTEGER, date DATE, "
+                                    "description VARCHAR(200), amount FLOAT)"))
+            connection.execute(text("CREATE TABLE statements (id INTEGER PRIMARY KEY, cardholder_id INTEGER, statement_date DATE)"))
+            connection.execute(text("CREATE TABLE transactions_archive_2025_01 (id INTEGER PRIMARY KEY, cardholder_id INTEGER, "
+                                    "date DATE, description VARCHAR(200), amount FLOAT)"))
+            connection.execute(text("INSERT INTO transactions_archive_2025_01 VALUES "
+                                    "(1, 1, '2025-01-05', 'old', 1), (2, 1, '2025-01-06', 'old', 2)"))
+            connection.execute(text("INSERT INTO transactions VALUES (1, 1, '2025-02-05', 'a', 3), "
+                                    "(2, 1, '2025-02-06', 'b', 4), (3, 1, '2025-02-07', 'c', 5)"))
+
+        apply_migrations(self.engine)
+
+        with self.engine.begin() as connection:
+            rows = connection.execute(text("SELECT id, description FROM transactions ORDER BY id")).all()
+            self.assertEqual([tuple(row) for row in rows], [(3, 'c'), (4, 'a'), (5, 'b')])
+            # Emptying the table does not bring old ids back
+            connection.execute(text("DELETE FROM transactions"))
+            connection.execute(text("INSERT INTO transactions (cardholder_id, date) VALUES (1, '2025-03-01')"))
+            self.assertEqual(connection.execute(text("SELECT id FROM transactions")).scalar(), 6)
+        self.assertIn('ix_transactions_cardholder_id_date', self.index_names('transactions'))
+        self.assertIn('ix_transactions_date', self.index_names('transactions'))
+
+    def test_migrations_are_recorded_and_not_reapplied(self):
+        Base.metadata.create_all(self.engine)
+        self.assertEqual(apply_migrations(self.engine), [m.version for m in MIGRATIONS])
+        self.assertEqual(apply_migrations(self.engine), [])
+
+        with self.engine.connect() as connection:
+            versions = connection.execute(text("SELECT version FROM schema_migrations")).scalars().all()
+        self.assertEqual(versions, [m.version for m in MIGRATIONS])
+
+if __name__ == '__main__':
+    unittest.main()
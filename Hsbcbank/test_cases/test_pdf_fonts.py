@@ -0,0 +1,63 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+from reportlab.pdfbase.ttfonts import TTFont
+import pdf_fonts
+
+class TestPDFFonts(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.font_path = os.path.join(pdf_fonts.font_dir, 'NotoSansTamil-Regular.ttf')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_cached_font_matches_parsed_font(self):
+        with mock.patch.object(pdf_fonts, 'FONT_CACHE_DIR', self.cache_dir):
+            parsed = pdf_fonts.load_font('CacheTest', self.font_path)
+            self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+            cached = pdf_fonts.load_font('CacheTest', self.font_path)
+
+        self.assertIsInstance(cached, TTFont)
+        self.assertEqual(cached.fontName, 'CacheTest')
+        self.assertEqual(cached.face.charWidths, parsed.face.charWidths)
+        self.assertEqual(cached.face._ttf_data, parsed.face._ttf_data)
+        self.assertEqual(cached.stringWidth('வணக்கம்', 10), parsed.stringWidth('வணக்கம்', 10))
+        for attribute, value in parsed.face.__dict__.items():
+            if attribute != '_pdfScale':
+                self.assertEqual(getattr(cached.face, attribute), value, attribute)
+        self.assertEqual(cached.face.fullName.ustr, parsed.face.fullName.ustr)
+        self.assertEqual(cached.encoding.name, parsed.encoding.name)
+
+    def test_unreadable_cache_falls_back_to_parsing(self):
+        with mock.patch.object(pdf_fonts, 'FONT_CACHE_DIR', self.cache_dir):
+            with open(pdf_fonts._cache_path(self.font_path), 'wb') as cache_file:
+                cache_file.write(b'not a pickle')
+            font = pdf_fonts.load_font('CacheTest', self.font_path)
+        self.assertGreater(len(font.face.charWidths), 0)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_cache_dir_writable_by_others_is_not_used(self):
+        os.chmod(self.cache_dir, 0o777)
+        with mock.patch.object(pdf_fonts, 'FONT_CACHE_DIR', self.cache_dir):
+            font = pdf_fonts.load_font('CacheTest', self.font_path)
+        self.assertGreater(len(font.face.charWidths), 0)
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_new_cache_dir_is_private(self):
+        cache_dir = os.path.join(self.cache_dir, 'fonts')
+        with mock.patch.object(pdf_fonts, 'FONT_CACHE_DIR', cache_dir):
+            pdf_fonts.load_font('CacheTest', self.font_path)
+        self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_languages_register_lazily(self):
+        pdf_fonts.ensure_language_fonts('hi')
+        self.assertIn('hi', pdf_fonts._registered_languages)
+        pdf_fonts.ensure_language_fonts('fr')
+        self.assertIn('en', pdf_fonts._registered_languages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
 
 import unittest
+import io
 import os
+import re
 from models import Cardholder, Transaction, Statement
 from pdf_generator import StatementPDFGenerator
+from pdf_styles import get_style_bundle
+from pdf_flowables import LazyTransactionTable
+from reportlab.platypus import Frame
 import datetime
 
 class TestPDFGeneration(unittest.TestCase):
@@ -59,5 +64,79 @@ class TestPDFGeneration(unittest.TestCase):
         self.assertTrue(os.path.exists(output_path))
         os.remove(output_path)
 
+    def test_render_bytes(self):
+        generator = StatementPDFGenerator(self.statement, self.cardholder, self.transactions, 'en')
+        pdf_bytes = generator.render_bytes()
+        self.assertTrue(pdf_bytes.startswith(b'%PDF'))
+
+    def test_generate_pdf_to_stream(self):
+        generator = StatementPDFGenerator(self.statement, self.cardholder, self.transactions, 'ta')
+        stream = io.BytesIO()
+        generator.generate_pdf_to(stream)
+        self.assertTrue(stream.getvalue().startswith(b'%PDF'))
+        self.assertFalse(stream.closed)
+
+    def test_generate_from_iterator(self):
+        def rows():
+            for i in range(40):
+                yield Transaction(date=datetime.date(2024, 4, 1), description=f"Purchase {i}", amount=10.0 + i)
+
+        generator = StatementPDFGenerator(self.statement, self.cardholder, rows(), 'hi', transaction_count=40)
+        self.assertTrue(generator.optimize_for_large_dataset)
+        self.assertTrue(generator.render_bytes().startswith(b'%PDF'))
+
+        # Without a count the stream is treated as a large dataset
+        generator = StatementPDFGenerator(self.statement, self.cardholder, rows(), 'ta')
+        self.assertIsNone(generator.transaction_count)
+        self.assertTrue(generator.render_bytes().startswith(b'%PDF'))
+
+    def test_lazy_table_builds_one_batch_per_page(self):
+        batches = []
+
+        def build_batch(batch, batch_index, batch_count, has_more):
+            batches.append((len(batch), batch_index, batch_count, has_more))
+            return []
+
+        rows = iter(range(35))
+        table = LazyTransactionTable(rows, 15, build_batch, total=35)
+        frame = Frame(0, 0, 100, 100)
+        while True:
+            table.frameAction(frame)
+            generated = getattr(frame, '_generated_content', [])
+            frame._generated_content = []
+            if table not in generated:
+                break
+        self.assertEqual(batches, [(15, 0, 3, True), (15, 1, 3, True), (5, 2, 3, False)])
+
+    def test_page_chrome_drawn_once_as_form(self):
+        transactions = [
+            Transaction(date=datetime.date(2024, 4, 1), description=f"Purchase {i}", amount=10.0 + i)
+            for i in range(60)
+        ]
+        generator = StatementPDFGenerator(self.statement, self.cardholder, transactions, 'en')
+        pdf_bytes = generator.render_bytes()
+        page_count = pdf_bytes.count(b'/Type /Page\n')
+        self.assertGreater(page_count, 1)
+        self.assertEqual(pdf_bytes.count(b'/Subtype /Form'), 1)
+        self.assertEqual(len(re.findall(rb'/FormXob\.StatementChrome_en \d+ 0 R', pdf_bytes)), page_count)
+
+    def test_style_bundle_shared_per_language(self):
+        first = StatementPDFGenerator(self.statement, self.cardholder, self.transactions, 'ta')
+        second = StatementPDFGenerator(self.statement, self.cardholder, self.transactions, 'ta')
+        self.assertIs(first.styles, second.styles)
+        self.assertIs(first.styles, get_style_bundle('ta'))
+        self.assertIsNot(first.styles, get_style_bundle('hi'))
+        self.assertEqual(first.styles.table_value.wordWrap, 'CJK')
+        self.assertIs(get_style_bundle('fr'), get_style_bundle('en'))
+
+    def test_generation_does_not_mutate_shared_styles(self):
+        styles = get_style_bundle('hi')
+        before = dict(styles.footer.__dict__)
+        generator = StatementPDFGenerator(self.statement, self.cardholder, self.transactions, 'hi')
+        output_path = "test_hi_styles.pdf"
+        generator.generate_pdf(output_path)
+        os.remove(output_path)
+        self.assertEqual(before, styles.footer.__dict__)
+
 if __name__ == '__main__':
     unittest.main()
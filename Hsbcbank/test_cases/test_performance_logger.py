@@ -0,0 +1,36 @@
+import asyncio
+import unittest
+from performance_logger import PerformanceLogger
+
+class TestPerformanceLogger(unittest.TestCase):
+    def test_concurrent_requests_on_one_thread_keep_their_own_timings(self):
+        perf_logger = PerformanceLogger()
+
+        @perf_logger.track_request
+        async def handle(delay):
+            perf_logger.start('render')
+            await asyncio.sleep(delay)
+            # Work done through to_thread reports to the same request
+            await asyncio.to_thread(perf_logger.start, 'persist')
+            await asyncio.to_thread(perf_logger.end, 'persist')
+            perf_logger.end('render')
+            return perf_logger.get_metrics()
+
+        async def main():
+            return await asyncio.gather(handle(0.2), handle(0.05))
+
+        slow, fast = asyncio.run(main())
+        self.assertGreaterEqual(slow['render']['duration_ms'], 200)
+        self.assertLess(fast['render']['duration_ms'], 150)
+        self.assertIn('persist', slow)
+        self.assertIn('persist', fast)
+        self.assertEqual(perf_logger.get_metrics(), {})
+
+    def test_outside_a_request_scope(self):
+        perf_logger = PerformanceLogger()
+        perf_logger.start('operation')
+        perf_logger.end('operation')
+        self.assertIn('operation', perf_logger.get_metrics())
+
+if __name__ == '__main__':
+    unittest.main()
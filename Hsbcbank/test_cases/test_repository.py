@@ -0,0 +1,146 @@
+import unittest
+import datetime
+from unittest import mock
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from models import Base, Cardholder, Statement, Transaction
+from repository import (
+    DateParser, bulk_insert_transactions, upsert_cardholder, CardholderCache,
+    aggregate_transactions, compute_statement_summary, get_period_transactions, iter_period_transactions
+)
+
+class TestRepository(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.cardholder = Cardholder(name="Test User", card_number="1234567890123456",
+                                     email="test@example.com", phone="1234567890")
+        self.session.add(self.cardholder)
+        self.session.flush()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_date_parser(self):
+        parse_date = DateParser()
+        self.assertEqual(parse_date('2025-03-02'), datetime.date(2025, 3, 2))
+        self.assertIs(parse_date('2025-03-02'), parse_date('2025-03-02'))
+        self.assertEqual(parse_date('02/03/2025'), datetime.date.today())
+        self.assertEqual(parse_date(None), datetime.date.today())
+
+    def test_bulk_insert_transactions(self):
+        data = [
+            {'date': '2025-03-01', 'description': 'First', 'amount': '10.50'},
+            {'date': 'invalid', 'amount': 5},
+        ]
+        records = bulk_insert_transactions(self.session, self.cardholder.id, data)
+        self.session.commit()
+
+        self.assertEqual([r.description for r in records], ['First', 'Transaction'])
+        self.assertEqual(records[0].amount, 10.5)
+        self.assertEqual(records[1].date, datetime.date.today())
+        self.assertFalse(hasattr(records[0], 'id'))
+
+        stored = self.session.scalars(select(Transaction).order_by(Transaction.id)).all()
+        self.assertEqual([(t.cardholder_id, t.description) for t in stored],
+                         [(self.cardholder.id, 'First'), (self.cardholder.id, 'Transaction')])
+
+    def test_bulk_insert_returns_ids_in_order(self):
+        data = [{'date': '2025-03-01', 'description': f'Purchase {i}', 'amount': i} for i in range(5)]
+        records = bulk_insert_transactions(self.session, self.cardholder.id, data, return_ids=True)
+        self.session.commit()
+        for record in records:
+            self.assertEqual(self.session.get(Transaction, record.id).description, record.description)
+
+    def test_empty_input(self):
+        self.assertEqual(bulk_insert_transactions(self.session, self.cardholder.id, []), [])
+
+    def test_upsert_cardholder_reuses_row(self):
+        data = {'name': "Test User", 'card_number': "1234567890123456",
+                'email': "new@example.com", 'phone': "1234567890"}
+        first = upsert_cardholder(self.session, data)
+        second = upsert_cardholder(self.session, dict(data, name="Renamed"))
+        self.session.commit()
+
+        self.assertEqual(first.id, self.cardholder.id)
+        self.assertEqual(second.id, self.cardholder.id)
+        self.assertEqual(self.session.scalar(select(func.count()).select_from(Cardholder)), 1)
+        self.session.refresh(self.cardholder)
+        self.assertEqual((self.cardholder.name, self.cardholder.email), ("Renamed", "new@example.com"))
+
+        other = upsert_cardholder(self.session, dict(data, card_number="6543210987654321"))
+        self.assertNotEqual(other.id, self.cardholder.id)
+
+    def test_cardholder_cache_skips_database_for_same_details(self):
+        cache = CardholderCache(max_entries=1)
+        data = {'name': "Test User", 'card_number': "1234567890123456",
+                'email': "test@example.com", 'phone': "1234567890"}
+        cardholder = upsert_cardholder(self.session, data, cache)
+        self.session.commit()
+        cache.put(cardholder)
+
+        with mock.patch.object(self.session, 'execute') as execute:
+            self.assertEqual(upsert_cardholder(self.session, data, cache).id, cardholder.id)
+        execute.assert_not_called()
+
+        # Changed details go to the database
+        self.assertIsNone(cache.get(dict(data, email="changed@example.com")))
+        cache.put(upsert_cardholder(self.session, dict(data, card_number="6543210987654321"), cache))
+        self.assertEqual(cache.get_stats()['entries'], 1)
+
+    def test_compute_statement_summary_from_ledger(self):
+        bulk_insert_transactions(self.session, self.cardholder.id, [
+            {'date': '2025-02-20', 'description': 'Before period', 'amount': 500},
+            {'date': '2025-03-01', 'description': 'Shop', 'amount': 1200.25},
+            {'date': '2025-03-10', 'description': 'Payment', 'amount': -300},
+            {'date': '2025-03-31', 'description': 'Fuel', 'amount': 99.75},
+        ])
+        self.session.add(Statement(cardholder_id=self.cardholder.id, statement_date=datetime.date(2025, 2, 28),
+                                   new_balance=1000.0, credit_limit=50000.0))
+        self.session.flush()
+
+        summary = compute_statement_summary(self.session, self.cardholder.id,
+                                            datetime.date(2025, 3, 1), datetime.date(2025, 3, 31),
+                                            finance_charges=45.0)
+        self.assertEqual(summary, {
+            'previous_balance': 1000.0,
+            'payments_received': 300.0,
+            'purchases_charges': 1300.0,
+            'finance_charges': 45.0,
+            'new_balance': 2045.0,
+            'credit_limit': 50000.0,
+            'available_credit': 47955.0,
+            'reward_points': 0
+        })
+        rows = get_period_transactions(self.session, self.cardholder.id,
+                                       datetime.date(2025, 3, 1), datetime.date(2025, 3, 31))
+        self.assertEqual([row.description for row in rows], ['Shop', 'Payment', 'Fuel'])
+
+    def test_aggregate_transactions_groups_by_cardholder(self):
+        other = upsert_cardholder(self.session, {'card_number': "6543210987654321"})
+        bulk_insert_transactions(self.session, self.cardholder.id, [{'date': '2025-03-01', 'amount': 10}] * 3)
+        bulk_insert_transactions(self.session, other.id, [{'date': '2025-03-01', 'amount': -5}])
+        totals = aggregate_transactions(self.session, [self.cardholder.id, other.id],
+                                        datetime.date(2025, 3, 1), datetime.date(2025, 3, 31))
+        self.assertEqual(totals[self.cardholder.id],
+                         {'purchases_charges': 30.0, 'payments_received': 0.0, 'transaction_count': 3})
+        self.assertEqual(totals[other.id],
+                         {'purchases_charges': 0.0, 'payments_received': 5.0, 'transaction_count': 1})
+
+        summary = compute_statement_summary(self.session, other.id, datetime.date(2025, 4, 1),
+                                            datetime.date(2025, 4, 30), default_credit_limit=1000.0)
+        self.assertEqual((summary['new_balance'], summary['available_credit']), (0.0, 1000.0))
+
+    def test_iter_period_transactions_streams_in_order(self):
+        bulk_insert_transactions(self.session, self.cardholder.id, [
+            {'date': f'2025-03-{day:02d}', 'description': f'Day {day}', 'amount': day} for day in range(31, 0, -1)
+        ])
+        rows = iter_period_transactions(self.session, self.cardholder.id,
+                                        datetime.date(2025, 3, 5), datetime.date(2025, 3, 10), batch_size=2)
+        self.assertFalse(isinstance(rows, list))
+        self.assertEqual([row.amount for row in rows], [5.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import os
+import shutil
+import tempfile
+from statement_cache import StatementPDFCache, make_cache_key
+
+class TestStatementCache(unittest.TestCase):
+    def test_key_ignores_dict_order(self):
+        first = make_cache_key({'language': 'en', 'statement': {'a': 1, 'b': 2}})
+        second = make_cache_key({'statement': {'b': 2, 'a': 1}, 'language': 'en'})
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, make_cache_key({'language': 'ta', 'statement': {'a': 1, 'b': 2}}))
+
+    def test_count_bounded_lru(self):
+        cache = StatementPDFCache(max_entries=2)
+        cache.put('a', b'1')
+        cache.put('b', b'2')
+        self.assertEqual(cache.get('a'), b'1')
+        cache.put('c', b'3')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'1')
+        self.assertEqual(cache.get('c'), b'3')
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (3, 1, 1))
+
+    def test_size_bounded_lru(self):
+        cache = StatementPDFCache(max_entries=10, max_bytes=10)
+        cache.put('a', b'x' * 6)
+        cache.put('b', b'y' * 6)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['bytes'], 6)
+        # Entries larger than the whole cache are not stored
+        cache.put('c', b'z' * 11)
+        self.assertIsNone(cache.get('c'))
+
+    def test_disk_tier(self):
+        disk_dir = tempfile.mkdtemp()
+        try:
+            cache = StatementPDFCache(disk_dir=disk_dir, max_disk_bytes=10)
+            cache.put('a', b'x' * 6)
+            cache.clear()
+            self.assertEqual(cache.get('a'), b'x' * 6)
+            self.assertEqual(cache.get_stats()['disk_hits'], 1)
+
+            cache.put('b', b'y' * 6)
+            self.assertEqual(sorted(os.listdir(disk_dir)), ['b.pdf'])
+        finally:
+            shutil.rmtree(disk_dir)
+
+if __name__ == '__main__':
+    unittest.main()
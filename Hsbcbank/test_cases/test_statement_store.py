@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from statement_store import StatementStore
+
+class TestStatementStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def set_times(self, path, written, used):
+        os.utime(path, (used, written))
+
+    def test_put_and_get_path(self):
+        store = StatementStore(self.directory)
+        unique_id, path = store.put(b'%PDF-1')
+        self.assertEqual(store.get_path(unique_id), path)
+        with open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), b'%PDF-1')
+        self.assertEqual(store.get_stats()['files'], 1)
+        self.assertEqual(store.get_stats()['bytes'], 6)
+
+    def test_unknown_or_malformed_ids_are_not_found(self):
+        store = StatementStore(self.directory)
+        self.assertIsNone(store.get_path('00000000-0000-4000-8000-000000000000'))
+        self.assertIsNone(store.get_path('../etc/passwd'))
+        self.assertIsNone(store.get_path(None))
+
+    def test_new_file_is_hidden_until_committed(self):
+        store = StatementStore(self.directory)
+        unique_id, partial_path = store.new_file()
+        with open(partial_path, 'wb') as partial:
+            partial.write(b'%PDF-2')
+        self.assertIsNone(store.get_path(unique_id))
+        path = store.commit(unique_id)
+        self.assertEqual(store.get_path(unique_id), path)
+
+    def test_expired_files_are_not_served_and_are_swept(self):
+        store = StatementStore(self.directory, ttl_seconds=60)
+        unique_id, path = store.put(b'%PDF-old')
+        kept_id, _ = store.put(b'%PDF-new')
+        now = time.time()
+        self.set_times(path, now - 120, now - 120)
+
+        self.assertIsNone(store.get_path(unique_id))
+        self.assertEqual(store.sweep(), {'expired': 1, 'evicted': 0})
+        self.assertFalse(os.path.exists(path))
+        self.assertIsNotNone(store.get_path(kept_id))
+        self.assertEqual(store.get_stats()['files'], 1)
+
+    def test_quota_evicts_least_recently_used(self):
+        store = StatementStore(self.directory, max_bytes=250)
+        now = time.time()
+        first_id, first_path = store.put(b'a' * 100)
+        second_id, second_path = store.put(b'b' * 100)
+        self.set_times(first_path, now - 30, now - 30)
+        self.set_times(second_path, now - 20, now - 20)
+        # Downloading the first file makes the second the least recently used
+        store.get_path(first_id)
+
+        third_id, _ = store.put(b'c' * 100)
+        self.assertIsNotNone(store.get_path(first_id))
+        self.assertIsNone(store.get_path(second_id))
+        self.assertIsNotNone(store.get_path(third_id))
+        stats = store.get_stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['bytes'], 200)
+
+    def test_content_key_reuses_stored_file(self):
+        store = StatementStore(self.directory, ttl_seconds=60)
+        unique_id, path = store.put(b'%PDF-same', content_key='key')
+        now = time.time()
+        self.set_times(path, now - 50, now - 50)
+
+        self.assertEqual(store.find('key'), (unique_id, path))
+        # Renewed, so it outlives the download link issued with it
+        self.assertGreater(os.stat(path).st_mtime, now - 1)
+        self.assertIsNone(store.find('other key'))
+        self.assertEqual(store.get_stats()['files'], 1)
+        self.assertEqual(store.get_stats()['reused'], 1)
+
+        os.unlink(path)
+        self.assertIsNone(store.find('key'))
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_directory_and_files_are_private(self):
+        directory = os.path.join(self.directory, 'statements')
+        store = StatementStore(directory)
+        _, path = store.put(b'%PDF-private')
+        _, partial_path = store.new_file()
+        self.assertEqual(os.stat(directory).st_mode & 0o777, 0o700)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(partial_path).st_mode & 0o777, 0o600)
+
+    @unittest.skipUnless(hasattr(os, 'getuid'), "POSIX permissions")
+    def test_directory_writable_by_others_is_refused(self):
+        os.chmod(self.directory, 0o777)
+        with self.assertRaises(PermissionError):
+            StatementStore(self.directory)
+
+    def test_existing_files_counted_on_startup(self):
+        StatementStore(self.directory).put(b'x' * 10)
+        self.assertEqual(StatementStore(self.directory).get_stats()['bytes'], 10)
+
+    def test_sweeper_runs_in_background(self):
+        store = StatementStore(self.directory, ttl_seconds=60).start_sweeper(interval_seconds=0.01)
+        try:
+            _, path = store.put(b'%PDF')
+            self.set_times(path, time.time() - 120, time.time() - 120)
+            deadline = time.time() + 5
+            while os.path.exists(path) and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            store.shutdown()
+        self.assertFalse(os.path.exists(path))
+        self.assertGreaterEqual(store.get_stats()['expired'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import threading
+import unittest
+from write_behind import WriteBehindQueue
+
+class TestWriteBehindQueue(unittest.TestCase):
+    def setUp(self):
+        self.written = []
+        self.calls = []
+
+    def persist(self, items):
+        self.calls.append(list(items))
+        if 'bad' in items:
+            raise ValueError("cannot persist")
+        self.written.extend(items)
+
+    def test_items_are_written_in_batches(self):
+        release = threading.Event()
+
+        def slow_persist(items):
+            release.wait(5)
+            self.persist(items)
+
+        queue = WriteBehindQueue(slow_persist, batch_size=10, retry_delay=0)
+        try:
+            # The worker holds the first item until released, the rest queue up behind it
+            for i in range(21):
+                queue.submit(i)
+            release.set()
+            queue.flush()
+        finally:
+            queue.shutdown()
+
+        self.assertEqual(sorted(self.written), list(range(21)))
+        self.assertLess(len(self.calls), 21)
+        self.assertTrue(all(len(batch) <= 10 for batch in self.calls))
+        stats = queue.get_stats()
+        self.assertEqual(stats['submitted'], 21)
+        self.assertEqual(stats['persisted'], 21)
+        self.assertEqual(stats['pending'], 0)
+
+    def test_failing_item_does_not_hold_back_its_batch(self):
+        queue = WriteBehindQueue(self.persist, batch_size=10, max_retries=3, retry_delay=0)
+        try:
+            queue.submit('bad')
+            queue.submit('good')
+            queue.flush()
+        finally:
+            queue.shutdown()
+
+        self.assertEqual(self.written, ['good'])
+        stats = queue.get_stats()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['persisted'], 1)
+
+    def test_full_queue_persists_inline(self):
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking_persist(items):
+            started.set()
+            release.wait(5)
+            self.persist(items)
+
+        queue = WriteBehindQueue(blocking_persist, batch_size=1, max_pending=1, retry_delay=0)
+        try:
+            queue.submit('first')
+            started.wait(5)
+            queue.submit('second')
+            # Queue is full: the caller writes this one itself once the worker lets go
+            inline = threading.Thread(target=queue.submit, args=('third',))
+            inline.start()
+            release.set()
+            inline.join(5)
+            queue.flush()
+        finally:
+            queue.shutdown()
+
+        self.assertEqual(sorted(self.written), ['first', 'second', 'third'])
+        self.assertEqual(queue.get_stats()['inline'], 1)
+
+    def test_shutdown_drains_pending_items(self):
+        queue = WriteBehindQueue(self.persist, batch_size=5, retry_delay=0)
+        for i in range(12):
+            queue.submit(i)
+        queue.shutdown()
+        self.assertEqual(sorted(self.written), list(range(12)))
+
+if __name__ == '__main__':
+    unittest.main()
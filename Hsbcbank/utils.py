@@ -2,10 +2,10 @@ import logging
 import time
 import os
 import tempfile
-import gc
 import psutil
 import datetime
 import re
+from memory_governor import memory_governor
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +35,22 @@ def create_temp_file(suffix='.pdf'):
     temp_file.close()
     return path
 
+def ensure_private_dir(path):
+    """Create a directory (mode 0700) if needed and check only this user can write to it.
+
+    Raises PermissionError when the directory belongs to another user or is
+    writable by group or others, since whoever can write to it can read,
+    replace or plant the files kept there.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.stat(path)
+    if hasattr(os, 'getuid') and (stat.st_uid != os.getuid() or stat.st_mode & 0o022):
+        raise PermissionError(f"{path} is not private to this user")
+    return path
+
 def clean_up_resources():
     """Force garbage collection and clean up resources"""
-    gc.collect()
+    memory_governor.collect()
     return get_memory_usage()
 
 def batch_process(items, batch_size=500, process_func=None):
@@ -55,8 +68,8 @@ def batch_process(items, batch_size=500, process_func=None):
         else:
             results.extend(batch)
         
-        # Force garbage collection after each batch
-        gc.collect()
+        # Let the memory governor decide whether a collection is needed
+        memory_governor.checkpoint()
     
     return results
 
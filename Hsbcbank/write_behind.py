@@ -0,0 +1,113 @@
+"""Background persistence for statements rendered from the request payload.
+
+Used by the write_behind persistence mode: the response does not wait for
+the cardholder, statement and transaction rows to be committed.
+"""
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Persist items on a background thread, off the request path.
+
+    persist(items) writes a list of items in one transaction. The worker
+    drains up to batch_size items at a time. A failing batch is retried item
+    by item with exponential backoff, so one bad item cannot hold back the
+    rest. Items that still fail after max_retries attempts are logged and
+    counted as failed.
+
+    Pending items only live in memory and are lost if the process dies
+    before they are written; shutdown() drains the queue first.
+    """
+
+    def __init__(self, persist, batch_size=50, max_retries=3, retry_delay=0.5, max_pending=10000):
+        self.persist = persist
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'persisted': 0, 'batches': 0, 'retries': 0, 'failed': 0, 'inline': 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._worker_loop, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def submit(self, item):
+        """Queue an item for persistence.
+
+        When the queue is full the item is written on the calling thread
+        instead, which slows callers down rather than dropping data.
+        """
+        self._count('submitted')
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            logger.warning("Write-behind queue full, persisting inline")
+            self._count('inline')
+            self._persist_one(item)
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.persist(batch)
+                self._count('batches')
+                self._count('persisted', len(batch))
+            except Exception as e:
+                logger.warning(f"Write-behind batch of {len(batch)} failed, retrying items: {str(e)}")
+                for item in batch:
+                    self._persist_one(item)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _persist_one(self, item):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.persist([item])
+                self._count('persisted')
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Write-behind item failed after {attempt} attempts: {str(e)}")
+                    self._count('failed')
+                    return False
+                self._count('retries')
+                time.sleep(delay)
+                delay *= 2
+
+    def flush(self):
+        """Block until every queued item has been handled"""
+        self._queue.join()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, pending=self._queue.qsize())
+
+    def shutdown(self):
+        """Write the remaining items and stop the worker"""
+        self._stop.set()
+        self._thread.join()